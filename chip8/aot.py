@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+
+from chip8.instructions import (
+    match, Instr, Dud, Branch, Graphics,
+    Ix00E0, Ix00EE, Ix1NNN, Ix2NNN, Ix3XNN, Ix4XNN, Ix5XY0, Ix6XNN, Ix7XNN,
+    Ix8XY0, Ix8XY1, Ix8XY2, Ix8XY3, Ix8XY4, Ix8XY5, Ix8XY6, Ix8XY7, Ix8XYE,
+    Ix9XY0, IxANNN, IxBNNN, IxCXNN, IxDXYN, IxEX9E, IxEXA1,
+    IxFX07, IxFX0A, IxFX15, IxFX18, IxFX1E, IxFX29, IxFX33, IxFX55, IxFX65, IxF002, IxFX3A,
+)
+from pathlib import Path
+import argparse
+import hashlib
+import importlib.util
+import os
+import tempfile
+
+# Bump when the generated code changes, so stale modules are not loaded
+VERSION = 2
+
+CACHE_DIR = Path.home() / ".cache" / "chip8" / "aot"
+
+# Stores end a block so code they rewrite is never run from a stale block
+STOPS = (Branch, Graphics, IxFX33, IxFX55)
+
+
+def decode(opcode: int) -> Instr:
+    return match(opcode)(
+        opcode=opcode,
+        x=(opcode & 0x0F00) >> 8,
+        y=(opcode & 0x00F0) >> 4,
+        n=opcode & 0x000F,
+        nn=opcode & 0x00FF,
+        nnn=opcode & 0x0FFF,
+    )
+
+
+def _skip(cond: str, end: int) -> list:
+    return [f"if {cond}:", f"    emu.pc = {(end + 2) & 0x0FFF}"]
+
+
+def _logic(op: str):
+    def gen(i, end, emu):
+        lines = [f"v[{i.x}] {op}= v[{i.y}]"]
+        if emu.quirk_vf_reset:
+            lines.append("v[15] = 0")
+        return lines
+    return gen
+
+
+def _shift(expr: str, flag: str):
+    def gen(i, end, emu):
+        lines = [] if emu.quirk_shifting else [f"v[{i.x}] = v[{i.y}]"]
+        return lines + [f"flag = {flag.format(x=i.x)}", f"v[{i.x}] = {expr.format(x=i.x)}", "v[15] = flag"]
+    return gen
+
+
+def _fx65(i, end, emu):
+    lines = [f"v[{k}] = mem[emu.i + {k}]" for k in range(i.x + 1)]
+    if emu.quirk_memory:
+        lines.append(f"emu.i += {i.x + 1}")
+    return lines
+
+
+# Python source for each instruction. end is the PC after the block, which
+# is what the PC holds while its instructions run.
+TEMPLATES = {
+    Dud: lambda i, end, emu: [],
+    Ix00E0: lambda i, end, emu: ["emu.scr.clear()", "emu.dirty = 1"],
+    Ix00EE: lambda i, end, emu: ["emu.pc = emu.stack.pop()"],
+    Ix1NNN: lambda i, end, emu: [f"emu.pc = {i.nnn}"],
+    Ix2NNN: lambda i, end, emu: [f"emu.stack.append({end})", f"emu.pc = {i.nnn}"],
+    Ix3XNN: lambda i, end, emu: _skip(f"v[{i.x}] == {i.nn}", end),
+    Ix4XNN: lambda i, end, emu: _skip(f"v[{i.x}] != {i.nn}", end),
+    Ix5XY0: lambda i, end, emu: _skip(f"v[{i.x}] == v[{i.y}]", end),
+    Ix9XY0: lambda i, end, emu: _skip(f"v[{i.x}] != v[{i.y}]", end),
+    Ix6XNN: lambda i, end, emu: [f"v[{i.x}] = {i.nn}"],
+    Ix7XNN: lambda i, end, emu: [f"v[{i.x}] = (v[{i.x}] + {i.nn}) & 0xFF"],
+    Ix8XY0: lambda i, end, emu: [f"v[{i.x}] = v[{i.y}]"],
+    Ix8XY1: _logic("|"),
+    Ix8XY2: _logic("&"),
+    Ix8XY3: _logic("^"),
+    Ix8XY4: lambda i, end, emu: [f"v[{i.x}] = (v[{i.x}] + v[{i.y}]) & 0xFF", f"v[15] = v[{i.x}] < v[{i.y}]"],
+    Ix8XY5: lambda i, end, emu: [
+        f"flag = v[{i.x}] >= v[{i.y}]", f"v[{i.x}] = (v[{i.x}] - v[{i.y}]) & 0xFF", "v[15] = flag",
+    ],
+    Ix8XY7: lambda i, end, emu: [
+        f"flag = v[{i.y}] >= v[{i.x}]", f"v[{i.x}] = (v[{i.y}] - v[{i.x}]) & 0xFF", "v[15] = flag",
+    ],
+    Ix8XY6: _shift("v[{x}] >> 1", "v[{x}] & 0x1"),
+    Ix8XYE: _shift("(v[{x}] << 1) & 0xFF", "v[{x}] >> 7"),
+    IxANNN: lambda i, end, emu: [f"emu.i = {i.nnn}"],
+    IxBNNN: lambda i, end, emu: [f"emu.pc = {i.nnn} + v[{i.x if emu.quirk_jumping else 0}]"],
+    IxCXNN: lambda i, end, emu: [f"v[{i.x}] = {i.nn} & emu.rng.randint(0, 255)"],
+    IxDXYN: lambda i, end, emu: [f"emu.scr.draw(emu, {i.x}, {i.y}, {i.n})", "emu.dirty = 1"],
+    IxEX9E: lambda i, end, emu: _skip(f"(emu.kbd[v[{i.x}] // 8] >> (v[{i.x}] % 8)) & 0x1", end),
+    IxEXA1: lambda i, end, emu: _skip(f"not (emu.kbd[v[{i.x}] // 8] >> (v[{i.x}] % 8)) & 0x1", end),
+    IxFX07: lambda i, end, emu: [f"v[{i.x}] = emu.dt"],
+    IxFX15: lambda i, end, emu: [f"emu.dt = v[{i.x}]"],
+    IxFX18: lambda i, end, emu: [f"emu.st = v[{i.x}]"],
+    IxFX1E: lambda i, end, emu: [f"emu.i += v[{i.x}]"],
+    IxFX29: lambda i, end, emu: [f"emu.i = v[{i.x}] * 5"],
+    IxFX65: _fx65,
+    IxF002: lambda i, end, emu: ["emu.pattern = bytes(mem[emu.i : emu.i + 16])"],
+    IxFX3A: lambda i, end, emu: [f"emu.pitch = v[{i.x}]"],
+}
+
+
+def blocks(emu) -> dict:
+    """Statically discover the basic blocks reachable from the entry point, {start: [(addr, instr), ...]}."""
+    beg, end = emu.start_addr, emu.start_addr + emu.rom_size
+    found = {}
+    todo = [emu.pc]
+    while todo:
+        start = todo.pop()
+        if start in found or not beg <= start < end or start % 2:
+            continue
+
+        block = []
+        addr = start
+        while addr < end:
+            instr = decode(emu.ifetch(addr))
+            block.append((addr, instr))
+            addr += emu.INSTRUCTION_SIZE
+            if isinstance(instr, STOPS):
+                break
+        found[start] = block
+
+        last = block[-1][1]
+        if isinstance(last, (Ix3XNN, Ix4XNN, Ix5XY0, Ix9XY0, IxEX9E, IxEXA1)):
+            todo += [addr, addr + emu.INSTRUCTION_SIZE]
+        elif isinstance(last, Ix1NNN):
+            todo.append(last.nnn)
+        elif isinstance(last, Ix2NNN):
+            todo += [last.nnn, addr]
+        elif isinstance(last, (IxFX0A, IxDXYN)):
+            # Both go back to themselves while waiting
+            todo += [block[-1][0], addr]
+        elif not isinstance(last, (Ix00EE, IxBNNN)):
+            todo.append(addr)
+    return found
+
+
+def generate(emu) -> str:
+    """Python source of a module with one function per basic block and a BLOCKS dispatch table."""
+    lines = [
+        f"# Generated from {Path(emu.rom).name}, do not edit",
+        "from chip8.aot import decode",
+        "",
+    ]
+    table = []
+    for start, block in sorted(blocks(emu).items()):
+        end = (block[-1][0] + emu.INSTRUCTION_SIZE) & 0x0FFF
+        body = []
+        for addr, instr in block:
+            template = TEMPLATES.get(type(instr))
+            if template is None:
+                # FX0A, the stores and anything unknown keep their own eval
+                lines.append(f"_{addr:03X} = decode(0x{instr.opcode:04X})")
+                body.append(f"_{addr:03X}.eval(emu)")
+            else:
+                body += template(instr, end, emu)
+
+        lines += ["", f"def _b{start:03X}(emu):", "    v = emu.v"]
+        if any("mem[" in line for line in body):
+            lines.append("    mem = emu.mem")
+        lines.append(f"    emu.pc = {end}")
+        lines += [f"    {line}" for line in body]
+        lines += [""]
+        table.append(f"    0x{start:03X}: (_b{start:03X}, {len(block)}),")
+
+    lines += ["", "BLOCKS = {", *table, "}", ""]
+    return "\n".join(lines)
+
+
+def key(emu) -> str:
+    quirks = (
+        emu.quirk_vf_reset, emu.quirk_memory, emu.quirk_disp_wait,
+        emu.quirk_clipping, emu.quirk_shifting, emu.quirk_jumping,
+    )
+    h = hashlib.sha256(emu.mem[emu.start_addr : emu.start_addr + emu.rom_size])
+    h.update(repr((emu.pc, quirks, VERSION)).encode())
+    return h.hexdigest()[:32]
+
+
+# Modules already imported by this process, by path
+_MODULES = {}
+
+
+def load(emu, cache_dir: Path = None):
+    """Import the compiled module for emu's ROM and quirks, generating it first if it isn't cached."""
+    path = Path(cache_dir or CACHE_DIR) / f"rom_{key(emu)}.py"
+    module = _MODULES.get(path)
+    if module is not None:
+        return module
+
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Unique per writer, sessions on other threads may be compiling the same ROM
+        with tempfile.NamedTemporaryFile("w", dir=path.parent, suffix=".tmp", delete=False) as tmp:
+            tmp.write(generate(emu))
+        os.replace(tmp.name, path)
+
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    _MODULES[path] = module
+    return module
+
+
+if __name__ == "__main__":
+    from chip8.emulator import EmuInterpreter
+
+    parser = argparse.ArgumentParser(description="Compile CHIP-8 ROMs ahead of time")
+    parser.add_argument("roms", nargs="+", help="Paths to CHIP-8 ROMs")
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR)
+    parser.add_argument("--print", action="store_true", help="Print the generated source instead of caching it")
+    args = parser.parse_args()
+
+    for rom in args.roms:
+        emu = EmuInterpreter(rom)
+        if args.print:
+            print(generate(emu))
+        else:
+            module = load(emu, args.cache_dir)
+            print(f"{rom}: {len(module.BLOCKS)} blocks -> {module.__file__}")
@@ -0,0 +1,120 @@
+import pygame
+from array import array
+from functools import lru_cache
+
+BEEP_FREQ = 880  # Hz, the tone played until a ROM loads an XO-CHIP pattern
+
+
+def pattern_rate(pitch: int) -> float:
+    """XO-CHIP playback rate of the 128 pattern bits in bits per second."""
+    return 4000 * 2 ** ((pitch - 64) / 48)
+
+
+@lru_cache(maxsize=64)
+def render(bits: tuple, rate: float, sample_rate: int, channels: int = 1, min_samples: int = 2048, volume: float = 0.2) -> bytes:
+    """
+    A loop of whole periods of bits played at rate, as signed 16 bit
+    samples. The loop is at least min_samples long and rounded to whole
+    samples, which bends the pitch by well under a cent.
+    """
+    amp = int(32767 * max(0.0, min(1.0, volume)))
+    period = len(bits) / rate * sample_rate
+    periods = max(1, -(-min_samples // max(1, int(period))))
+    n = max(1, round(period * periods))
+    span = len(bits) * periods
+    high, low = array("h", [amp] * channels).tobytes(), array("h", [-amp] * channels).tobytes()
+    return b"".join(high if bits[k * span // n % len(bits)] else low for k in range(n))
+
+
+@lru_cache(maxsize=64)
+def pattern_bits(pattern: bytes) -> tuple:
+    return tuple((byte >> (7 - b)) & 1 for byte in pattern for b in range(8))
+
+
+class Audio:
+    """
+    Sound timer output streamed into a mixer channel, one chunk per
+    emulated 60 Hz frame, so beeps are as long as the ROM asked for
+    regardless of how the host loop is paced. Waveforms are rendered once
+    per pattern and pitch and then only sliced, continuing at the phase the
+    previous chunk ended. At most max_backlog frames are kept queued;
+    anything beyond that, e.g. while fast-forwarding, is dropped. Without
+    an audio device the mixer is not initialized and everything is silent.
+    """
+
+    def __init__(self, timer_freq: int = 60, max_backlog: int = 4):
+        init = pygame.mixer.get_init()
+        self.enabled = init is not None
+        if not self.enabled:
+            print("No audio device, sound is off")
+            return
+
+        self.sample_rate, _, self.channels = init
+        self.frame_bytes = 2 * self.channels
+        self.samples_per_frame = self.sample_rate / timer_freq
+        self.max_backlog = max_backlog
+        self.channel = pygame.mixer.Channel(0)
+
+        self.frames = None
+        self.phase = 0
+        self.carry = 0.0
+        self.pending = []
+        self.silence = bytes(self.frame_bytes * (int(self.samples_per_frame) + 1))
+
+    def wave(self, emu) -> bytes:
+        if emu.pattern is None:
+            return render((1, 0), 2 * BEEP_FREQ, self.sample_rate, self.channels)
+        return render(pattern_bits(emu.pattern), pattern_rate(emu.pitch), self.sample_rate, self.channels)
+
+    def chunk(self, emu, on: bool) -> bytes:
+        # Whole samples this frame, carrying the fraction to the next
+        self.carry += self.samples_per_frame
+        n = int(self.carry)
+        self.carry -= n
+        size = n * self.frame_bytes
+        if not on:
+            return self.silence[:size]
+
+        wave = self.wave(emu)
+        self.phase %= len(wave)
+        out = wave[self.phase : self.phase + size]
+        while len(out) < size:
+            out += wave[: size - len(out)]
+        self.phase = (self.phase + size) % len(wave)
+        return out
+
+    def update(self, emu):
+        """Queue audio for the frames emulated since the last call."""
+        if not self.enabled:
+            return
+        if self.frames is None or emu.frames < self.frames:
+            # First call or the emulator was rewound
+            self.frames = emu.frames
+            return
+
+        new = emu.frames - self.frames
+        self.frames = emu.frames
+        if not new:
+            return
+
+        # st only says whether the tone is on now, count it for every new frame
+        on = emu.st > 0
+        if not on and not self.pending and not self.channel.get_busy():
+            return
+        for _ in range(min(new, self.max_backlog)):
+            self.pending.append(self.chunk(emu, on))
+        del self.pending[: -self.max_backlog]
+
+        if self.channel.get_queue() is None:
+            sound = pygame.mixer.Sound(buffer=b"".join(self.pending))
+            self.pending.clear()
+            if self.channel.get_busy():
+                self.channel.queue(sound)
+            else:
+                self.channel.play(sound)
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.channel.stop()
+        self.pending.clear()
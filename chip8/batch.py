@@ -0,0 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
+from chip8.emulator import EMU_TYPES
+
+
+def run_session(rom: str, emu_type: str = "basicblock", frames: int = 600, seed: int = None, **kwargs):
+    """Run one headless emulator for a number of 60 Hz frames and return it."""
+    emu = EMU_TYPES[emu_type](rom, seed=seed, **kwargs)
+    emu.run_frames(frames)
+    return emu
+
+
+def run_batch(roms: list, workers: int = None, **kwargs) -> list:
+    """
+    Run every ROM in its own emulator on a thread pool. Emulator instances
+    share no mutable state, so on a free-threaded build the sessions run in
+    parallel. Returns the emulators in the order of roms.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda rom: run_session(rom, **kwargs), roms))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+from chip8.batch import run_batch
+from chip8.emulator import EMU_TYPES
+import argparse
+import sys
+import time
+import tracemalloc
+
+
+def bench_threads(args):
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}")
+    print(f"{args.sessions} sessions x {args.frames} frames, {args.emu_type}")
+
+    base = None
+    for threads in args.threads:
+        start = time.perf_counter()
+        emus = run_batch([args.rom] * args.sessions, workers=threads, emu_type=args.emu_type, frames=args.frames, seed=0)
+        elapsed = time.perf_counter() - start
+
+        instrs = sum(e.frames * e.RATIO for e in emus)
+        base = base or elapsed
+        print(f"{threads:3} threads: {elapsed:7.3f}s {instrs / elapsed:12,.0f} instr/s speedup {base / elapsed:5.2f}x")
+
+
+def bench_backends(args):
+    print(f"{args.frames} frames of {args.rom}, best of {args.repeat}")
+
+    base = None
+    for name, cls in dict.fromkeys((cls.__name__, cls) for cls in EMU_TYPES.values()):
+        best = None
+        for _ in range(args.repeat):
+            emu = cls(args.rom, seed=0)
+            start = time.perf_counter()
+            emu.run_frames(args.frames)
+            elapsed = time.perf_counter() - start
+            best = min(best or elapsed, elapsed)
+
+        instrs = args.frames * emu.RATIO
+        base = base or best
+        print(f"{name:16} {best:7.3f}s {instrs / best:12,.0f} instr/s speedup {base / best:5.2f}x")
+
+
+def bench_fork(args):
+    emu = EMU_TYPES[args.emu_type](args.rom, seed=0)
+    emu.run_frames(args.frames)
+    print(f"{args.forks} forks of {args.emu_type} after {args.frames} frames")
+
+    start = time.perf_counter()
+    for _ in range(args.forks):
+        emu.fork()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    children = [emu.fork() for _ in range(args.forks)]
+    per_fork = (tracemalloc.get_traced_memory()[0] - base) / len(children)
+    tracemalloc.stop()
+
+    print(f"{args.forks / elapsed:12,.0f} forks/s {per_fork:10,.0f} bytes/fork")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CHIP-8 emulator benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    threads = sub.add_parser("threads", help="Scaling of independent sessions with thread count")
+    threads.add_argument("rom", help="Path to CHIP-8 ROM")
+    threads.add_argument("--emu-type", type=str, default="basicblock")
+    threads.add_argument("--sessions", type=int, default=16)
+    threads.add_argument("--frames", type=int, default=600)
+    threads.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    threads.set_defaults(func=bench_threads)
+
+    backends = sub.add_parser("backends", help="Throughput of every emulator backend on one ROM")
+    backends.add_argument("rom", help="Path to CHIP-8 ROM")
+    backends.add_argument("--frames", type=int, default=600)
+    backends.add_argument("--repeat", type=int, default=3)
+    backends.set_defaults(func=bench_backends)
+
+    fork = sub.add_parser("fork", help="Speed and memory of Emu.fork")
+    fork.add_argument("rom", help="Path to CHIP-8 ROM")
+    fork.add_argument("--emu-type", type=str, default="basicblock")
+    fork.add_argument("--frames", type=int, default=60, help="Frames run before forking")
+    fork.add_argument("--forks", type=int, default=10000)
+    fork.set_defaults(func=bench_fork)
+
+    args = parser.parse_args()
+    args.func(args)
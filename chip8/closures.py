@@ -0,0 +1,357 @@
+from chip8.instructions import (
+    Instr, Dud,
+    Ix00E0, Ix00EE, Ix1NNN, Ix2NNN, Ix3XNN, Ix4XNN, Ix5XY0, Ix6XNN, Ix7XNN,
+    Ix8XY0, Ix8XY1, Ix8XY2, Ix8XY3, Ix8XY4, Ix8XY5, Ix8XY6, Ix8XY7, Ix8XYE,
+    Ix9XY0, IxANNN, IxBNNN, IxCXNN, IxDXYN, IxEX9E, IxEXA1,
+    IxFX07, IxFX15, IxFX18, IxFX1E, IxFX29, IxFX65, IxF002, IxFX3A,
+)
+
+# Each factory turns a decoded instruction into a closure over its operands,
+# called with the emulator to run on. Quirks are resolved once, at decode
+# time, the buffers are looked up on every call so sessions running the same
+# code, forks included, can share one ops list.
+
+
+def _00E0(emu, ins):
+    def op(emu):
+        emu.scr.clear()
+        emu.dirty = 1
+    return op
+
+
+def _00EE(emu, ins):
+    def op(emu):
+        emu.pc = emu.stack.pop()
+    return op
+
+
+def _1NNN(emu, ins):
+    nnn = ins.nnn
+
+    def op(emu):
+        emu.pc = nnn
+    return op
+
+
+def _2NNN(emu, ins):
+    nnn = ins.nnn
+
+    def op(emu):
+        emu.stack.append(emu.pc)
+        emu.pc = nnn
+    return op
+
+
+def _3XNN(emu, ins):
+    x, nn = ins.x, ins.nn
+
+    def op(emu):
+        if emu.v[x] == nn:
+            emu.pc = (emu.pc + 2) & 0x0FFF
+    return op
+
+
+def _4XNN(emu, ins):
+    x, nn = ins.x, ins.nn
+
+    def op(emu):
+        if emu.v[x] != nn:
+            emu.pc = (emu.pc + 2) & 0x0FFF
+    return op
+
+
+def _5XY0(emu, ins):
+    x, y = ins.x, ins.y
+
+    def op(emu):
+        v = emu.v
+        if v[x] == v[y]:
+            emu.pc = (emu.pc + 2) & 0x0FFF
+    return op
+
+
+def _9XY0(emu, ins):
+    x, y = ins.x, ins.y
+
+    def op(emu):
+        v = emu.v
+        if v[x] != v[y]:
+            emu.pc = (emu.pc + 2) & 0x0FFF
+    return op
+
+
+def _6XNN(emu, ins):
+    x, nn = ins.x, ins.nn
+
+    def op(emu):
+        emu.v[x] = nn
+    return op
+
+
+def _7XNN(emu, ins):
+    x, nn = ins.x, ins.nn
+
+    def op(emu):
+        v = emu.v
+        v[x] = (v[x] + nn) & 0xFF
+    return op
+
+
+def _8XY0(emu, ins):
+    x, y = ins.x, ins.y
+
+    def op(emu):
+        v = emu.v
+        v[x] = v[y]
+    return op
+
+
+def _8XY1(emu, ins):
+    x, y = ins.x, ins.y
+    if emu.quirk_vf_reset:
+        def op(emu):
+            v = emu.v
+            v[x] |= v[y]
+            v[0xF] = 0
+    else:
+        def op(emu):
+            v = emu.v
+            v[x] |= v[y]
+    return op
+
+
+def _8XY2(emu, ins):
+    x, y = ins.x, ins.y
+    if emu.quirk_vf_reset:
+        def op(emu):
+            v = emu.v
+            v[x] &= v[y]
+            v[0xF] = 0
+    else:
+        def op(emu):
+            v = emu.v
+            v[x] &= v[y]
+    return op
+
+
+def _8XY3(emu, ins):
+    x, y = ins.x, ins.y
+    if emu.quirk_vf_reset:
+        def op(emu):
+            v = emu.v
+            v[x] ^= v[y]
+            v[0xF] = 0
+    else:
+        def op(emu):
+            v = emu.v
+            v[x] ^= v[y]
+    return op
+
+
+def _8XY4(emu, ins):
+    x, y = ins.x, ins.y
+
+    def op(emu):
+        v = emu.v
+        v[x] = (v[x] + v[y]) & 0xFF
+        v[0xF] = v[x] < v[y]
+    return op
+
+
+def _8XY5(emu, ins):
+    x, y = ins.x, ins.y
+
+    def op(emu):
+        v = emu.v
+        flag = v[x] >= v[y]
+        v[x] = (v[x] - v[y]) & 0xFF
+        v[0xF] = flag
+    return op
+
+
+def _8XY6(emu, ins):
+    x, y = ins.x, ins.y
+    shifting = emu.quirk_shifting
+
+    def op(emu):
+        v = emu.v
+        if not shifting:
+            v[x] = v[y]
+        flag = v[x] & 0x1
+        v[x] >>= 0x1
+        v[0xF] = flag
+    return op
+
+
+def _8XY7(emu, ins):
+    x, y = ins.x, ins.y
+
+    def op(emu):
+        v = emu.v
+        flag = v[y] >= v[x]
+        v[x] = (v[y] - v[x]) & 0xFF
+        v[0xF] = flag
+    return op
+
+
+def _8XYE(emu, ins):
+    x, y = ins.x, ins.y
+    shifting = emu.quirk_shifting
+
+    def op(emu):
+        v = emu.v
+        if not shifting:
+            v[x] = v[y]
+        flag = v[x] >> 0x7
+        v[x] = (v[x] << 0x1) & 0xFF
+        v[0xF] = flag
+    return op
+
+
+def _ANNN(emu, ins):
+    nnn = ins.nnn
+
+    def op(emu):
+        emu.i = nnn
+    return op
+
+
+def _BNNN(emu, ins):
+    nnn = ins.nnn
+    x = ins.x if emu.quirk_jumping else 0x0
+
+    def op(emu):
+        emu.pc = nnn + emu.v[x]
+    return op
+
+
+def _CXNN(emu, ins):
+    x, nn = ins.x, ins.nn
+
+    def op(emu):
+        emu.v[x] = nn & emu.rng.randint(0, 255)
+    return op
+
+
+def _DXYN(emu, ins):
+    x, y, n = ins.x, ins.y, ins.n
+
+    def op(emu):
+        emu.scr.draw(emu, x, y, n)
+        emu.dirty = 1
+    return op
+
+
+def _EX9E(emu, ins):
+    x = ins.x
+
+    def op(emu):
+        vx = emu.v[x]
+        if (emu.kbd[vx // 8] >> (vx % 8)) & 0x1:
+            emu.pc = (emu.pc + 2) & 0x0FFF
+    return op
+
+
+def _EXA1(emu, ins):
+    x = ins.x
+
+    def op(emu):
+        vx = emu.v[x]
+        if not (emu.kbd[vx // 8] >> (vx % 8)) & 0x1:
+            emu.pc = (emu.pc + 2) & 0x0FFF
+    return op
+
+
+def _FX07(emu, ins):
+    x = ins.x
+
+    def op(emu):
+        emu.v[x] = emu.dt
+    return op
+
+
+def _FX15(emu, ins):
+    x = ins.x
+
+    def op(emu):
+        emu.dt = emu.v[x]
+    return op
+
+
+def _FX18(emu, ins):
+    x = ins.x
+
+    def op(emu):
+        emu.st = emu.v[x]
+    return op
+
+
+def _FX1E(emu, ins):
+    x = ins.x
+
+    def op(emu):
+        emu.i += emu.v[x]
+    return op
+
+
+def _FX29(emu, ins):
+    x = ins.x
+
+    def op(emu):
+        emu.i = emu.v[x] * 5
+    return op
+
+
+def _FX65(emu, ins):
+    count = ins.x + 1
+    memory = emu.quirk_memory
+
+    def op(emu):
+        v, mem, i = emu.v, emu.mem, emu.i
+        for k in range(count):
+            v[k] = mem[i + k]
+        if memory:
+            emu.i = i + count
+    return op
+
+
+def _F002(emu, ins):
+    def op(emu):
+        emu.pattern = bytes(emu.mem[emu.i : emu.i + 16])
+    return op
+
+
+def _FX3A(emu, ins):
+    x = ins.x
+
+    def op(emu):
+        emu.pitch = emu.v[x]
+    return op
+
+
+def _Dud(emu, ins):
+    def op(emu):
+        pass
+    return op
+
+
+FACTORIES = {
+    Dud: _Dud,
+    Ix00E0: _00E0, Ix00EE: _00EE, Ix1NNN: _1NNN, Ix2NNN: _2NNN,
+    Ix3XNN: _3XNN, Ix4XNN: _4XNN, Ix5XY0: _5XY0, Ix9XY0: _9XY0,
+    Ix6XNN: _6XNN, Ix7XNN: _7XNN,
+    Ix8XY0: _8XY0, Ix8XY1: _8XY1, Ix8XY2: _8XY2, Ix8XY3: _8XY3, Ix8XY4: _8XY4,
+    Ix8XY5: _8XY5, Ix8XY6: _8XY6, Ix8XY7: _8XY7, Ix8XYE: _8XYE,
+    IxANNN: _ANNN, IxBNNN: _BNNN, IxCXNN: _CXNN, IxDXYN: _DXYN,
+    IxEX9E: _EX9E, IxEXA1: _EXA1,
+    IxFX07: _FX07, IxFX15: _FX15, IxFX18: _FX18, IxFX1E: _FX1E, IxFX29: _FX29, IxFX65: _FX65,
+    IxF002: _F002, IxFX3A: _FX3A,
+}
+
+
+def bind(emu, instr: Instr):
+    """Op running instr on the emulator it is called with. Anything without a factory (FX0A, stores, wrappers) is its eval."""
+    factory = FACTORIES.get(type(instr))
+    if factory is not None:
+        return factory(emu, instr)
+    return instr.eval
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+from chip8.emulator import EmuInterpreter
+from chip8 import aot
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import hashlib
+import json
+
+NGRAMS = (2, 3, 4)
+
+
+def _name(instr) -> str:
+    return instr.id or instr.name
+
+
+class EmuCounter(EmuInterpreter):
+    """Interpreter that counts executed opcodes, sequences and writes to executed code."""
+
+    def __init__(self, rom: str, **kwargs):
+        self.ops = Counter()
+        self.ngrams = {n: Counter() for n in NGRAMS}
+        self.recent = deque(maxlen=max(NGRAMS))
+        self.executed = set()
+        self.writes = []
+        super().__init__(rom, **kwargs)
+
+    def store(self, beg: int, end: int):
+        self.writes.append((beg, end))
+
+    def tick(self):
+        self.executed.add(self.pc)
+        instr = self.decode(self.fetch())
+        name = _name(type(instr))
+        self.ops[name] += 1
+        self.recent.append(name)
+        recent = tuple(self.recent)
+        for n in NGRAMS:
+            if len(recent) >= n:
+                self.ngrams[n][" ".join(recent[-n:])] += 1
+        self.next()
+        self.execute(instr)
+
+    def self_modifying_writes(self) -> int:
+        code = {a + k for a in self.executed for k in range(self.INSTRUCTION_SIZE)}
+        return sum(1 for beg, end in self.writes if any(a in code for a in range(beg, end)))
+
+
+def analyze(rom: str, frames: int = 600, seed: int = 0) -> dict:
+    """Static and dynamic statistics of one ROM. Runs headless, with no keys pressed."""
+    data = Path(rom).read_bytes()
+    result = {"rom": str(rom), "sha256": hashlib.sha256(data).hexdigest(), "size": len(data)}
+
+    emu = EmuCounter(rom, seed=seed)
+
+    # Static: every aligned word of the image, and the blocks reachable from the entry point
+    names = [_name(type(aot.decode(emu.ifetch(a)))) for a in range(emu.pc, emu.pc + len(data) - 1, emu.INSTRUCTION_SIZE)]
+    result["static"] = {
+        "opcodes": Counter(names),
+        "ngrams": {n: Counter(" ".join(names[k : k + n]) for k in range(len(names) - n + 1)) for n in NGRAMS},
+        "block_lengths": Counter(len(block) for block in aot.blocks(emu).values()),
+    }
+
+    try:
+        emu.run_frames(frames)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    result["dynamic"] = {"opcodes": emu.ops, "ngrams": emu.ngrams, "instructions": sum(emu.ops.values())}
+    result["self_modifying_writes"] = emu.self_modifying_writes()
+    return result
+
+
+def merge(results: list, top: int = None) -> dict:
+    static = {"opcodes": Counter(), "ngrams": {n: Counter() for n in NGRAMS}, "block_lengths": Counter()}
+    dynamic = {"opcodes": Counter(), "ngrams": {n: Counter() for n in NGRAMS}, "instructions": 0}
+    roms = {}
+    for r in results:
+        static["opcodes"].update(r["static"]["opcodes"])
+        static["block_lengths"].update(r["static"]["block_lengths"])
+        dynamic["opcodes"].update(r["dynamic"]["opcodes"])
+        dynamic["instructions"] += r["dynamic"]["instructions"]
+        for n in NGRAMS:
+            static["ngrams"][n].update(r["static"]["ngrams"][n])
+            dynamic["ngrams"][n].update(r["dynamic"]["ngrams"][n])
+        roms[r["rom"]] = {
+            k: r[k] for k in ("sha256", "size", "self_modifying_writes", "error") if k in r
+        } | {"instructions": r["dynamic"]["instructions"]}
+
+    for hist in (static, dynamic):
+        for n in NGRAMS:
+            hist["ngrams"][n] = dict(hist["ngrams"][n].most_common(top))
+        hist["opcodes"] = dict(hist["opcodes"].most_common())
+    static["block_lengths"] = dict(sorted(static["block_lengths"].items()))
+
+    return {
+        "roms": len(results),
+        "static": static,
+        "dynamic": dynamic,
+        "self_modification": {
+            "roms": sum(1 for r in roms.values() if r["self_modifying_writes"]),
+            "writes": sum(r["self_modifying_writes"] for r in roms.values()),
+        },
+        "errors": sum(1 for r in roms.values() if "error" in r),
+        "per_rom": roms,
+    }
+
+
+def _analyze(args: tuple) -> dict:
+    return analyze(*args)
+
+
+def scan(roms: list, workers: int = None, frames: int = 600, top: int = 100) -> dict:
+    """Analyze every ROM in a process pool and merge the results."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_analyze, [(rom, frames) for rom in roms], chunksize=8))
+    return merge(results, top=top)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Opcode and pattern histograms over a ROM library")
+    parser.add_argument("paths", nargs="+", help="ROM files or directories searched for *.ch8")
+    parser.add_argument("--output", "-o", type=str, default="corpus.json")
+    parser.add_argument("--frames", type=int, default=600, help="Frames each ROM is run for")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=100, help="Most common sequences kept per length")
+    args = parser.parse_args()
+
+    roms = []
+    for path in map(Path, args.paths):
+        roms += sorted(path.rglob("*.ch8")) if path.is_dir() else [path]
+
+    report = scan(roms, workers=args.workers, frames=args.frames, top=args.top)
+    Path(args.output).write_text(json.dumps(report, separators=(",", ":")))
+    print(f"{report['roms']} ROMs, {report['dynamic']['instructions']} instructions, "
+          f"{report['self_modification']['roms']} self-modifying, {report['errors']} errors -> {args.output}")
@@ -0,0 +1,242 @@
+from chip8.emulator import EmuPreDecoded, EmuAOT
+from chip8.instructions import Breakpoint, BreakpointHit, Branch, Instr, IxFX33, IxFX55
+
+
+class WatchpointHit(Exception):
+    def __init__(self, pc: int, beg: int, end: int):
+        self.pc = pc
+        self.beg = beg
+        self.end = end
+        super().__init__(f"Write to 0x{beg:03X}-0x{end - 1:03X} at 0x{pc:03X}")
+
+
+class Watchpoint(Branch):
+    name = "WCH"
+
+    def __init__(self, instr: Instr, dbg, **kwargs):
+        super().__init__(instr.opcode, **kwargs)
+        self.instr = instr
+        self.dbg = dbg
+
+    def eval(self, emu):
+        beg, end = written(self.instr, emu)
+        self.instr.eval(emu)
+        self.dbg.check(emu.pc - emu.INSTRUCTION_SIZE, beg, end)
+
+    def __str__(self):
+        return f"{self.name+':':4} {self.instr}"
+
+
+def written(instr: Instr, emu) -> tuple:
+    """Memory range (beg, end) the store instr is about to write."""
+    beg = emu.i
+    return beg, beg + (3 if isinstance(instr, IxFX33) else instr.x + 1)
+
+
+def condition(expr: str):
+    """Compile an expression such as "v3 == 5 and i > 0x300" into a predicate on the emulator."""
+    code = compile(expr, "<condition>", "eval")
+
+    def cond(emu):
+        env = {f"v{r:x}": emu.v[r] for r in range(16)}
+        env.update(v=emu.v, i=emu.i, pc=emu.pc, dt=emu.dt, st=emu.st, mem=emu.mem)
+        return eval(code, {}, env)
+
+    return cond
+
+
+class Debugger:
+    """
+    Breakpoints and watchpoints are patched into the code cache instead of
+    being checked on every tick. A breakpoint replaces its predecoded entry
+    and always starts its own basic block, and a watchpoint wraps the
+    FX33/FX55 stores, so everything else keeps running at full speed.
+    The plain interpreter has no code cache, so there breakpoints and
+    watchpoints are checked around every tick instead.
+    """
+
+    def __init__(self, emu):
+        self.emu = emu
+        self.breakpoints = {}
+        self.watches = []
+        self.conditions = []
+        self.hits = []
+        self.skip = None
+
+        if isinstance(emu, EmuPreDecoded):
+            emu.patch = self._patch
+
+    def _patch(self, addr: int, instr: Instr) -> Instr:
+        if self.watches and isinstance(instr, (IxFX33, IxFX55)):
+            instr = Watchpoint(instr, self)
+        if addr in self.breakpoints:
+            instr = Breakpoint(instr, cond=self.breakpoints[addr])
+        return instr
+
+    def _repatch(self, addr: int):
+        self.emu.invalidate(addr, addr + self.emu.INSTRUCTION_SIZE)
+
+    def add_breakpoint(self, addr: int, cond=None):
+        if isinstance(cond, str):
+            cond = condition(cond)
+        self.breakpoints[addr] = cond
+        self._repatch(addr)
+
+    def remove_breakpoint(self, addr: int):
+        self.breakpoints.pop(addr, None)
+        self._repatch(addr)
+
+    def add_watchpoint(self, addr: int, size: int = 1):
+        self.watches.append((addr, addr + size))
+        self._repatch_stores()
+
+    def remove_watchpoint(self, addr: int):
+        self.watches = [w for w in self.watches if w[0] != addr]
+        self._repatch_stores()
+
+    def _repatch_stores(self):
+        emu = self.emu
+        if not isinstance(emu, EmuPreDecoded):
+            return
+        stores = [addr for addr, instr in enumerate(emu.cc) if isinstance(instr, (IxFX33, IxFX55, Watchpoint))]
+        if isinstance(emu, EmuAOT):
+            # Compiled blocks run their stores directly, invalidating drops them to the patched code cache
+            stores += [addr for addr in sorted(emu.covered) if isinstance(emu.decode(emu.ifetch(addr)), (IxFX33, IxFX55))]
+        for addr in stores:
+            self._repatch(addr)
+
+    def check(self, pc: int, beg: int, end: int):
+        """Record a hit if the store at pc to mem[beg:end] touched a watched range."""
+        for wbeg, wend in self.watches:
+            if wbeg < end and beg < wend:
+                self.hits.append(WatchpointHit(pc, beg, end))
+                break
+
+    def add_condition(self, cond):
+        """Stop whenever cond holds. Unlike breakpoints this is checked after every tick."""
+        if isinstance(cond, str):
+            cond = condition(cond)
+        self.conditions.append(cond)
+
+    def _resume(self):
+        emu = self.emu
+        if isinstance(emu, EmuPreDecoded):
+            instr = emu.cc[emu.pc]
+            if isinstance(instr, Breakpoint):
+                instr.armed = False
+        else:
+            self.skip = emu.pc
+
+    def tick(self):
+        """Run one emulator tick and return the reason to stop, if any."""
+        emu = self.emu
+        store = None
+        if not isinstance(emu, EmuPreDecoded):
+            # The plain interpreter has no code cache to patch
+            pc = emu.pc
+            skip, self.skip = self.skip, None
+            if pc in self.breakpoints and pc != skip:
+                cond = self.breakpoints[pc]
+                try:
+                    if cond is None or cond(emu):
+                        return BreakpointHit(pc)
+                except Exception as e:
+                    return BreakpointHit(pc, error=e)
+            if self.watches:
+                instr = emu.decode(emu.fetch())
+                if isinstance(instr, (IxFX33, IxFX55)):
+                    store = written(instr, emu)
+
+        try:
+            emu.tick()
+        except BreakpointHit as hit:
+            return hit
+
+        if store is not None:
+            self.check(pc, *store)
+        if self.hits:
+            return self.hits.pop()
+        for cond in self.conditions:
+            try:
+                if cond(emu):
+                    return f"Condition met at 0x{emu.pc:03X}"
+            except Exception as e:
+                return f"Condition failed at 0x{emu.pc:03X}: {type(e).__name__}: {e}"
+
+    def step(self):
+        """Execute exactly one instruction, even inside a basic block."""
+        emu = self.emu
+        if not isinstance(emu, EmuPreDecoded):
+            emu.tick()
+            return
+        instr = emu.cc[emu.pc]
+        if isinstance(instr, Breakpoint):
+            instr = instr.instr
+        emu.next()
+        emu.execute(instr)
+
+    def cont(self, limit: int = None):
+        self._resume()
+        n = 0
+        while limit is None or n < limit:
+            if reason := self.tick():
+                return reason
+            n += 1
+
+    def disasm(self, addr: int, count: int = 8):
+        emu = self.emu
+        lines = []
+        for a in range(addr, addr + count * emu.INSTRUCTION_SIZE, emu.INSTRUCTION_SIZE):
+            opcode = emu.ifetch(a)
+            instr = emu.cc[a] if isinstance(emu, EmuPreDecoded) else emu.decode(opcode)
+            marker = ">" if a == emu.pc else " "
+            lines.append(f"{marker}{a:06X}: {opcode:04X} {instr}")
+        return "\n".join(lines)
+
+    def repl(self, reason=None):
+        """Interactive prompt. Returns False if the user asked to quit."""
+        if reason:
+            print(reason)
+        print(self.disasm(self.emu.pc, 4))
+
+        while True:
+            try:
+                line = input("(chip8) ").split()
+            except EOFError:
+                return False
+            if not line:
+                continue
+
+            cmd, args = line[0], line[1:]
+            try:
+                if cmd in ["c", "continue"]:
+                    self._resume()
+                    return True
+                elif cmd in ["s", "step"]:
+                    for _ in range(int(args[0], 0) if args else 1):
+                        self.step()
+                    print(self.disasm(self.emu.pc, 1))
+                elif cmd in ["b", "break"]:
+                    self.add_breakpoint(int(args[0], 0), " ".join(args[1:]) or None)
+                elif cmd in ["d", "delete"]:
+                    self.remove_breakpoint(int(args[0], 0))
+                elif cmd in ["w", "watch"]:
+                    self.add_watchpoint(int(args[0], 0), int(args[1], 0) if len(args) > 1 else 1)
+                elif cmd in ["u", "unwatch"]:
+                    self.remove_watchpoint(int(args[0], 0))
+                elif cmd in ["cond"]:
+                    self.add_condition(" ".join(args))
+                elif cmd in ["r", "regs"]:
+                    print(self.emu)
+                elif cmd in ["x", "mem"]:
+                    addr = int(args[0], 0)
+                    size = int(args[1], 0) if len(args) > 1 else 16
+                    print(f"{addr:06X}: {self.emu.mem[addr : addr + size].hex(' ')}")
+                elif cmd in ["l", "list"]:
+                    print(self.disasm(int(args[0], 0) if args else self.emu.pc))
+                elif cmd in ["q", "quit"]:
+                    return False
+                else:
+                    print("Commands: c, s [n], b ADDR [COND], d ADDR, w ADDR [LEN], u ADDR, cond EXPR, r, x ADDR [LEN], l [ADDR], q")
+            except (IndexError, ValueError, SyntaxError) as e:
+                print(e)
@@ -1,6 +1,17 @@
-from chip8.instructions import match, Instr, Dud, Chain, Branch, Graphics, IxFX55
+from chip8.instructions import match, Instr, Dud, Undecoded, Chain, Probe, Superblock, Branch, Graphics, Breakpoint, IxFX33, IxFX55
+from chip8.instructions import Ix3XNN, Ix4XNN, Ix5XY0, Ix9XY0, IxEX9E, IxEXA1
 from chip8.io import Screen, Keyboard
+from chip8.optimizer import Optimizer
+from chip8.closures import bind
+from chip8 import aot
+from collections import OrderedDict
 from pathlib import Path
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
 
 
 class OpcodeSizeError(ValueError):
@@ -10,6 +21,12 @@ class OpcodeSizeError(ValueError):
         super().__init__(f"Opcode must be {expected} bytes, got {actual}")
 
 
+class CacheSizeError(ValueError):
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        super().__init__(f"Cache capacity must be at least 1, got {capacity}")
+
+
 class Emu:
     INSTRUCTION_SIZE = 2
     MEM_SIZE = 0x1000
@@ -50,13 +67,16 @@ class Emu:
         quirk_clipping=True,
         quirk_shifting=False,
         quirk_jumping=False,
+        seed=None,
         debug=False,
     ):
         self.debug = debug
+        self.rng = random.Random(seed)
 
         self.mem = bytearray(mem_size)
         self.mem[: len(self.FONT)] = self.FONT
 
+        self.start_addr = start_addr
         self.pc = start_addr
 
         self.i = 0x0
@@ -71,9 +91,18 @@ class Emu:
         self.st = 0
         self.it = 0
 
+        # XO-CHIP audio, None plays the plain beep
+        self.pattern = None
+        self.pitch = 64
+
         self.release = 0
         self.ctr = ratio
         self.dirty = 1
+        self.frames = 0
+        self.exec_time = 0.0
+        # Execution is only timed when asked for, e.g. by chip8.metrics
+        self.timing = False
+        self.invalidations = 0
 
         self.quirk_vf_reset = quirk_vf_reset
         self.quirk_memory = quirk_memory
@@ -89,6 +118,70 @@ class Emu:
         opcodes = Path(rom).read_bytes()
         self.rom_size = len(opcodes)
         self.mem[self.pc : self.pc + self.rom_size] = opcodes
+        self.image = opcodes
+
+    def reload(self, reset: bool = False) -> list:
+        """
+        Load the ROM file again, patching only the bytes that differ from
+        the image loaded before and invalidating only those ranges. Returns
+        the changed (beg, end) ranges. With reset the machine restarts and
+        memory is brought back to the fresh image as well. A ROM that shrank
+        under the PC or a return address always resets, that code is gone.
+        """
+        new = Path(self.rom).read_bytes()
+        start = self.start_addr
+        removed = range(start + len(new), start + len(self.image))
+        if any(addr in removed for addr in (self.pc, *self.stack)):
+            reset = True
+        if reset:
+            target = bytearray(len(self.mem))
+            target[: len(self.FONT)] = self.FONT
+            target[start : start + len(new)] = new
+            changed = [a for a in range(len(self.mem)) if self.mem[a] != target[a]]
+        else:
+            old = self.image
+            size = max(len(old), len(new))
+            old, pad = old.ljust(size, b"\0"), new.ljust(size, b"\0")
+            target = bytearray(self.mem)
+            target[start : start + size] = pad
+            changed = [start + k for k in range(size) if old[k] != pad[k]]
+
+        # Coalesce changed bytes into runs
+        ranges = []
+        for a in changed:
+            if ranges and ranges[-1][1] == a:
+                ranges[-1][1] = a + 1
+            else:
+                ranges.append([a, a + 1])
+
+        for beg, end in ranges:
+            self.mem[beg:end] = target[beg:end]
+            # The new image is decoded as on load, elsewhere only bytes decoded before matter
+            if beg < start + len(new) and start < end:
+                self.invalidate(beg, end)
+            else:
+                self.store(beg, end)
+
+        self.image = new
+        self.rom_size = len(new)
+        if reset:
+            self.reset()
+        return [tuple(r) for r in ranges]
+
+    def reset(self):
+        """Restart execution from the start address, keeping memory and decoded code."""
+        self.pc = self.start_addr
+        self.i = 0x0
+        self.v[:] = bytes(len(self.v))
+        self.stack.clear()
+        self.scr.clear()
+        self.kbd[:] = bytes(len(self.kbd))
+        self.dt = self.st = self.it = 0
+        self.release = 0
+        self.ctr = self.RATIO
+        self.dirty = 1
+        self.pattern = None
+        self.pitch = 64
 
     def next(self):
         self.pc = (self.pc + self.INSTRUCTION_SIZE) & 0x0FFF
@@ -104,10 +197,67 @@ class Emu:
     def tick(self):
         pass
 
+    def run_frames(self, n: int = 1):
+        target = self.frames + n
+        if not self.timing:
+            while self.frames < target:
+                self.tick()
+            return
+        start = time.perf_counter()
+        while self.frames < target:
+            self.tick()
+        self.exec_time += time.perf_counter() - start
+
+    def instructions(self) -> int:
+        """Instructions executed so far, derived from the timer counters."""
+        return int(self.frames * self.RATIO + self.RATIO - self.ctr)
+
+    def snapshot(self):
+        return (
+            bytes(self.mem), bytes(self.v), self.pc, self.i, tuple(self.stack),
+            bytes(self.scr), bytes(self.kbd),
+            self.dt, self.st, self.it, self.release, self.ctr, self.dirty, self.frames,
+            self.pattern, self.pitch, self.rng.getstate(),
+        )
+
+    def restore(self, state):
+        # Buffers are restored in place so outside views of them stay valid
+        (
+            mem, v, self.pc, self.i, stack,
+            scr, kbd,
+            self.dt, self.st, self.it, self.release, self.ctr, self.dirty, self.frames,
+            self.pattern, self.pitch, rng,
+        ) = state
+        self.rng.setstate(rng)
+        self.mem[:] = mem
+        self.v[:] = v
+        self.stack[:] = stack
+        self.scr[:] = scr
+        self.kbd[:] = kbd
+
+    def fork(self):
+        """
+        Independent copy for branching searches. The decoded code is shared
+        until either emulator rewrites it, the machine state is copied.
+        """
+        child = object.__new__(type(self))
+        child.__dict__.update(self.__dict__)
+        # Copying 4 KiB outright is cheaper than tracking writes per page
+        child.mem = bytearray(self.mem)
+        child.v = bytearray(self.v)
+        child.stack = list(self.stack)
+        child.scr = self.scr.copy()
+        child.kbd = self.kbd.copy()
+        # Skip seeding, the state is replaced anyway
+        child.rng = random.Random.__new__(random.Random)
+        child.rng.setstate(self.rng.getstate())
+        return child
+
     def timer(self):
         self.ctr -= 1
         if not self.ctr:
             self.ctr = Emu.RATIO
+            self.frames += 1
             if self.dt:
                 self.dt -= 1
             if self.st:
@@ -115,6 +265,13 @@ class Emu:
             if self.it:
                 self.it -= 1
 
+    def invalidate(self, beg: int, end: int):
+        pass
+
+    def store(self, beg: int, end: int):
+        """Called after FX33/FX55 wrote mem[beg:end]."""
+        pass
+
     def __str__(self):
         acc = []
         acc.append(f"pc: {self.pc} i: {self.i}")
@@ -149,10 +306,7 @@ class EmuInterpreter(Emu):
 
     def execute(self, instr: Instr):
         instr.eval(self)
-        if type(instr) is Chain:
-            for _ in range(len(instr.instrs)):
-                self.timer()
-        else:
+        for _ in range(instr.cycles):
             self.timer()
 
     def tick(self):
@@ -166,25 +320,143 @@ class EmuInterpreter(Emu):
         self.execute(instr)
 
 
+class CodeCache:
+    """
+    Decoded code shared between sessions running the same ROM with the same
+    quirks. Sessions only read the shared entries and copy them on their
+    first write to code, see EmuPreDecoded.unshare. Basic blocks are not
+    shared: every session forms its own, so no shared entry is ever written
+    and sessions on different threads need no locking. Only the capacity
+    most recently attached entries are kept, sessions already attached to
+    an evicted entry keep using it.
+    """
+
+    CAPACITY = 64
+
+    def __init__(self, capacity: int = CAPACITY):
+        if capacity < 1:
+            raise CacheSizeError(capacity)
+        self.entries = OrderedDict()
+        self.capacity = capacity
+        self.lock = threading.Lock()
+
+    def key(self, emu) -> tuple:
+        quirks = (
+            emu.quirk_vf_reset, emu.quirk_memory, emu.quirk_disp_wait,
+            emu.quirk_clipping, emu.quirk_shifting, emu.quirk_jumping,
+        )
+        return (type(emu).__name__, hashlib.sha256(emu.mem).hexdigest(), emu.pc, quirks)
+
+    def attach(self, emu):
+        key = self.key(emu)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+            else:
+                emu.build()
+                self.entries[key] = emu.caches()
+                while len(self.entries) > self.capacity:
+                    self.entries.popitem(last=False)
+            emu.attach(self.entries[key])
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+CODE_CACHE = CodeCache()
+
+
 class EmuPreDecoded(EmuInterpreter):
-    def __init__(self, rom: str, **kwargs):
+
+    def __init__(self, rom: str, share: bool = False, **kwargs):
         super().__init__(rom, **kwargs)
-        self.cc = [Dud(0x0000)] * len(self.mem)
-        self._build_cache(beg=self.pc, end=self.pc + self.rom_size)
+        self.patch = None
+        self.shared = False
+        if share:
+            CODE_CACHE.attach(self)
+        else:
+            self.build()
 
         if self.debug:
             for i in range(self.pc, self.pc + self.rom_size):
                 print(f"{i:06X}: {self.cc[i]}")
             print("End of code cache")
 
+    def build(self):
+        # Odd addresses stay Dud, blocks slice cc and drop them. The rest
+        # is decoded on first use, see decoded.
+        self.cc = [Undecoded(), Dud(0x0000)] * (len(self.mem) // 2)
+        self._build_cache(beg=self.pc, end=self.pc + self.rom_size)
+
+    def caches(self) -> dict:
+        return {"cc": self.cc}
+
+    def attach(self, caches: dict):
+        for name, cache in caches.items():
+            setattr(self, name, cache)
+        self.shared = True
+
     def _build_cache(self, beg: int = Emu.START_ADDR, end: int = Emu.MEM_SIZE):
         for addr in range(beg, end, Emu.INSTRUCTION_SIZE):
             opcode = self.ifetch(addr)
             instr = self.decode(opcode)
+            if self.patch:
+                instr = self.patch(addr, instr)
             self.cc[addr] = instr
             if self.debug:
                 print(f"Decoding 0x{addr:06X}: {instr}")
 
+    def decoded(self, addr: int) -> Instr:
+        """
+        cc[addr], decoding Undecoded entries with a non-zero word first.
+        The result is written to this session's own copy of the caches,
+        so it is decoded once and store() keeps it up to date like any
+        other decoded entry.
+        """
+        instr = self.cc[addr]
+        if type(instr) is Undecoded and self.ifetch(addr):
+            if self.shared:
+                self.unshare()
+            self._build_cache(beg=addr, end=addr + self.INSTRUCTION_SIZE)
+            instr = self.cc[addr]
+        return instr
+
+    def snapshot(self):
+        # The caches are shared with the snapshot and copied on the next write
+        self.shared = True
+        return (super().snapshot(), self.cc)
+
+    def restore(self, state):
+        state, self.cc = state
+        super().restore(state)
+        self.shared = True
+
+    def unshare(self):
+        self.cc = list(self.cc)
+        self.shared = False
+
+    def fork(self):
+        # Both sides copy the caches on their next write to code
+        self.shared = True
+        return super().fork()
+
+    def invalidate(self, beg: int, end: int):
+        self.invalidations += 1
+        if self.shared:
+            self.unshare()
+        self._build_cache(beg=beg & 0xFFFE, end=end)
+
+    def store(self, beg: int, end: int):
+        # Data stores leave the caches, and sharing, alone. Only bytes
+        # decoded into cc that now read differently are code rewrites.
+        cc = self.cc
+        for addr in range(beg & 0xFFFE, end, self.INSTRUCTION_SIZE):
+            instr = cc[addr]
+            if type(instr) is not Undecoded and instr.opcode != self.ifetch(addr):
+                self.invalidate(beg, end)
+                return
+
     def fetch(self) -> Instr:
         return self.cc[self.pc]
 
@@ -198,32 +470,271 @@ class EmuPreDecoded(EmuInterpreter):
         self.execute(instr)
 
 
+class BlockCache(dict):
+    """
+    Basic blocks by start address, without a bound. A plain dict, so
+    lookups pay for no bookkeeping; LRUBlockCache adds a capacity. The
+    memory held by the blocks is totalled as they are added and removed.
+    """
+
+    capacity = None
+
+    def __init__(self):
+        super().__init__()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.sizes = {}
+        self.bytes = 0
+
+    @staticmethod
+    def size(obj) -> int:
+        """Estimated bytes of a block and the instructions in it."""
+        n = sys.getsizeof(obj)
+        if isinstance(obj, Instr):
+            n += sys.getsizeof(vars(obj))
+        if isinstance(obj, Chain):
+            n += sys.getsizeof(obj.instrs) + sum(BlockCache.size(i) for i in obj.instrs)
+        return n
+
+    def __setitem__(self, addr: int, blk: Chain):
+        n = self.size(blk)
+        self.bytes += n - self.sizes.get(addr, 0)
+        self.sizes[addr] = n
+        super().__setitem__(addr, blk)
+
+    def __delitem__(self, addr: int):
+        super().__delitem__(addr)
+        self.bytes -= self.sizes.pop(addr)
+
+    def copy(self):
+        bb = block_cache(self.capacity)
+        dict.update(bb, self)
+        bb.sizes = dict(self.sizes)
+        bb.bytes = self.bytes
+        bb.hits, bb.misses, bb.evictions, bb.invalidations = self.hits, self.misses, self.evictions, self.invalidations
+        return bb
+
+    def memory(self) -> int:
+        """Estimated bytes held by the cache, its blocks and the instructions in them."""
+        return sys.getsizeof(self) + self.bytes
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "blocks": len(self),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "memory": self.memory(),
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        return (
+            f"{s['blocks']}/{s['capacity'] or 'unbounded'} blocks, {s['hit_rate']:.1%} hits, "
+            f"{s['evictions']} evicted, {s['invalidations']} invalidated, ~{s['memory'] // 1024} KiB"
+        )
+
+
+class LRUBlockCache(BlockCache):
+    """Block cache of at most capacity blocks, the least recently used is evicted first."""
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise CacheSizeError(capacity)
+        super().__init__()
+        self.capacity = capacity
+
+    def __setitem__(self, addr: int, blk: Chain):
+        if addr not in self:
+            while len(self) >= self.capacity:
+                # Dicts keep insertion order, the first key is the least recently used
+                del self[next(iter(self))]
+                self.evictions += 1
+        super().__setitem__(addr, blk)
+
+    def touch(self, addr: int):
+        """Mark the block at addr as the most recently used."""
+        dict.__setitem__(self, addr, dict.pop(self, addr))
+
+
+def block_cache(capacity: int = None) -> BlockCache:
+    """Unbounded BlockCache, or LRUBlockCache with a capacity."""
+    return BlockCache() if capacity is None else LRUBlockCache(capacity)
+
+
 class EmuBasicBlock(EmuPreDecoded):
-    def __init__(self, rom: str, **kwargs):
+    SKIPS = (Ix3XNN, Ix4XNN, Ix5XY0, Ix9XY0, IxEX9E, IxEXA1)
+
+    HOT = 32  # skip executions before a superblock is formed
+    BIAS = 0.9  # share of executions the hot side of a skip needs
+    MAX_SEGMENTS = 8
+
+    def __init__(
+        self,
+        rom: str,
+        optimize: bool = False,
+        superblocks: bool = False,
+        profile: str = None,
+        cache_size: int = None,
+        **kwargs,
+    ):
+        self.cache_size = cache_size
+        self.optimizer = Optimizer(self) if optimize else None
+        self.superblocks = superblocks or profile is not None
+        self.profile = {}
+        self.exits = {}
         super().__init__(rom, **kwargs)
 
-        self.bb = {}
+        if profile is not None:
+            self.load_profile(profile)
+
+    def build(self):
+        super().build()
+        self.bb = block_cache(self.cache_size)
+
+    def attach(self, caches: dict):
+        super().attach(caches)
+        self.bb = block_cache(self.cache_size)
 
     def nnext(self, instr: Chain):
-        n = self.INSTRUCTION_SIZE * len(instr.instrs)
+        n = self.INSTRUCTION_SIZE * instr.cycles
         self.pc = (self.pc + n) & 0x0FFF
 
+    def block(self, beg: int) -> Chain:
+        end = beg
+        # Code outside the image is decoded as blocks reach it, zero words end the block
+        while not isinstance(self.decoded(end), (Branch, Graphics, IxFX33, IxFX55)):
+            # A breakpoint always starts its own block
+            if isinstance(self.cc[end + self.INSTRUCTION_SIZE], Breakpoint):
+                break
+            end += self.INSTRUCTION_SIZE
+
+        chain = self.compose(*self.cc[beg : end + self.INSTRUCTION_SIZE])
+        if self.optimizer:
+            chain = self.optimizer.optimize(chain, beg)
+        return chain
+
+    def hot_side(self, skip: int):
+        """Address execution continues at after a biased skip, None if it isn't biased yet."""
+        counts = self.profile.get(skip)
+        if counts is None or counts[0] + counts[1] < self.HOT:
+            return None
+        total = counts[0] + counts[1]
+        if counts[0] >= self.BIAS * total:
+            return skip + self.INSTRUCTION_SIZE
+        if counts[1] >= self.BIAS * total:
+            return skip + 2 * self.INSTRUCTION_SIZE
+        return None
+
+    def form(self, beg: int) -> Chain:
+        chain = self.block(beg)
+        if not self.superblocks or not chain.instrs or not isinstance(self.cc[beg + 2 * (chain.cycles - 1)], self.SKIPS):
+            return chain
+
+        segments = []
+        addr = beg
+        while True:
+            skip = addr + self.INSTRUCTION_SIZE * (chain.cycles - 1)
+            hot = tail = None
+            if chain.instrs and isinstance(self.cc[skip], self.SKIPS) and len(segments) < self.MAX_SEGMENTS - 1:
+                hot = self.hot_side(skip)
+                tail = skip
+            segments.append((addr, chain, hot))
+            if hot is None:
+                break
+            addr = hot
+            chain = self.block(addr)
+
+        if len(segments) > 1:
+            # Side exits counted for an earlier superblock here must not deoptimize this one
+            self.exits.pop(beg, None)
+            return Superblock(*segments, tail=tail)
+        return Probe(*chain.instrs, addr=beg, cycles=chain.cycles)
+
+    def promote(self, addr: int):
+        self.bb[addr] = self.form(addr)
+        if self.debug:
+            print(f"Superblock at {addr:06X}: {self.bb[addr]}")
+
+    def deoptimize(self, sb: Superblock):
+        # Guards keep failing, drop the superblock and profile its skips again
+        addr = sb.segments[0][0]
+        self.exits.pop(addr, None)
+        if self.bb.get(addr) is sb:
+            del self.bb[addr]
+        for seg, chain, hot in sb.segments:
+            self.profile.pop(seg + self.INSTRUCTION_SIZE * (chain.cycles - 1), None)
+
+    def load_profile(self, path: str):
+        try:
+            data = json.loads(Path(path).read_text())
+        except FileNotFoundError:
+            return
+        if data.get("rom") == hashlib.sha256(Path(self.rom).read_bytes()).hexdigest():
+            self.profile.update({int(k, 16): v for k, v in data["skips"].items()})
+
+    def save_profile(self, path: str):
+        data = {
+            "rom": hashlib.sha256(Path(self.rom).read_bytes()).hexdigest(),
+            "skips": {f"{k:03X}": v for k, v in sorted(self.profile.items())},
+        }
+        Path(path).write_text(json.dumps(data, indent=1))
+
     def fetch(self):
-        if self.pc not in self.bb:
+        bb = self.bb
+        blk = bb.get(self.pc)
+        if blk is None:
+            bb.misses += 1
             if self.debug:
                 print(f"Fetching BB starting at {self.pc:06X}")
 
-            beg = self.pc
-            end = beg
-            while not isinstance(self.cc[end], (Branch, Graphics, IxFX55)):
-                end += self.INSTRUCTION_SIZE
-
-            self.bb[self.pc] = self.compose(*self.cc[beg : end + self.INSTRUCTION_SIZE])
+            blk = self.form(self.pc)
+            # Decoding on the way may have unshared the caches
+            self.bb[self.pc] = blk
 
             if self.debug:
-                print(f"{self.pc:06X}: {self.bb[self.pc]}")
-
-        return self.bb[self.pc]
+                print(f"{self.pc:06X}: {blk}")
+        else:
+            bb.hits += 1
+            if bb.capacity is not None:
+                bb.touch(self.pc)
+
+        return blk
+
+    def snapshot(self):
+        return (super().snapshot(), self.bb)
+
+    def restore(self, state):
+        state, self.bb = state
+        super().restore(state)
+
+    def unshare(self):
+        super().unshare()
+        self.bb = self.bb.copy()
+
+    def fork(self):
+        # The block cache stays shared like the code cache, copied on the next write to code
+        child = super().fork()
+        child.profile = {k: list(v) for k, v in self.profile.items()}
+        child.exits = {k: list(v) for k, v in self.exits.items()}
+        if self.optimizer:
+            child.optimizer = Optimizer(child)
+        return child
+
+    def invalidate(self, beg: int, end: int):
+        super().invalidate(beg, end)
+        for k in list(self.bb.keys()):
+            blk = self.bb[k]
+            segments = blk.segments if isinstance(blk, Superblock) else ((k, blk, None),)
+            if any(a < end and beg < a + self.INSTRUCTION_SIZE * c.cycles for a, c, _ in segments):
+                del self.bb[k]
+                self.bb.invalidations += 1
 
     def tick(self):
         instr = self.fetch()
@@ -233,3 +744,136 @@ class EmuBasicBlock(EmuPreDecoded):
 
         self.nnext(instr)
         self.execute(instr)
+
+
+class EmuThreaded(EmuPreDecoded):
+    """
+    Closure-threaded dispatch: decoding also binds every instruction to a
+    plain closure over its operands, and the run loop calls ops[pc] with the
+    emulator directly. The closures hold no emulator state, so the ops list
+    is shared and copied like the code cache.
+    """
+
+    def build(self):
+        self.ops = [None] * len(self.mem)
+        super().build()
+        for addr, instr in enumerate(self.cc):
+            if self.ops[addr] is None:
+                self.ops[addr] = bind(self, instr)
+
+    def caches(self) -> dict:
+        return {**super().caches(), "ops": self.ops}
+
+    def _build_cache(self, beg: int = Emu.START_ADDR, end: int = Emu.MEM_SIZE):
+        super()._build_cache(beg=beg, end=end)
+        for addr in range(beg, end, Emu.INSTRUCTION_SIZE):
+            self.ops[addr] = bind(self, self.cc[addr])
+
+    def snapshot(self):
+        return (super().snapshot(), self.ops)
+
+    def restore(self, state):
+        state, self.ops = state
+        super().restore(state)
+
+    def unshare(self):
+        super().unshare()
+        self.ops = list(self.ops)
+
+    def tick(self):
+        op = self.ops[self.pc]
+
+        if self.debug:
+            print(f"{self.pc:06X}: {self.cc[self.pc]}")
+
+        self.pc = (self.pc + self.INSTRUCTION_SIZE) & 0x0FFF
+        op(self)
+        self.timer()
+
+
+class EmuAOT(EmuPreDecoded):
+    """
+    Runs basic blocks compiled ahead of time into a Python module, see
+    chip8.aot. Addresses without a compiled block, and blocks whose bytes
+    were rewritten by FX33/FX55, run on the pre-decoded path. Only the
+    addresses no compiled block covers are decoded up front.
+    """
+
+    def __init__(self, rom: str, cache_dir: str = None, **kwargs):
+        self.cache_dir = cache_dir
+        super().__init__(rom, **kwargs)
+
+    def build(self):
+        self.blocks = dict(aot.load(self, self.cache_dir).BLOCKS)
+        self.compiled = bytes(self.mem)
+        self.covered = set()
+        for addr, (_, cycles) in self.blocks.items():
+            self.covered.update(range(addr, addr + self.INSTRUCTION_SIZE * cycles, self.INSTRUCTION_SIZE))
+
+        # Covered addresses keep their Undecoded entries, which still run correctly if jumped into
+        self.cc = [Undecoded(), Dud(0x0000)] * (len(self.mem) // 2)
+        for addr in range(self.pc, self.pc + self.rom_size, self.INSTRUCTION_SIZE):
+            if addr not in self.covered:
+                self._build_cache(beg=addr, end=addr + self.INSTRUCTION_SIZE)
+
+    def caches(self) -> dict:
+        return {**super().caches(), "blocks": self.blocks, "compiled": self.compiled, "covered": self.covered}
+
+    def snapshot(self):
+        return (super().snapshot(), self.blocks, self.covered)
+
+    def restore(self, state):
+        state, self.blocks, self.covered = state
+        super().restore(state)
+
+    def unshare(self):
+        super().unshare()
+        self.blocks = dict(self.blocks)
+        self.covered = set(self.covered)
+
+    def store(self, beg: int, end: int):
+        super().store(beg, end)
+        # Compiled code has no cc entries to compare with, compare with the bytes it was compiled from
+        covered = self.covered
+        if any(a in covered for a in range(beg & 0xFFFE, end, self.INSTRUCTION_SIZE)):
+            if self.mem[beg:end] != self.compiled[beg:end]:
+                self.invalidate(beg, end)
+
+    def invalidate(self, beg: int, end: int):
+        super().invalidate(beg, end)
+        for k in [k for k, (_, cycles) in self.blocks.items() if k < end and beg < k + self.INSTRUCTION_SIZE * cycles]:
+            _, cycles = self.blocks.pop(k)
+            stop = k + self.INSTRUCTION_SIZE * cycles
+            self.covered.difference_update(range(k, stop, self.INSTRUCTION_SIZE))
+            self._build_cache(beg=k, end=stop)
+
+    def tick(self):
+        blk = self.blocks.get(self.pc)
+        if blk is None:
+            super().tick()
+            return
+
+        if self.debug:
+            print(f"{self.pc:06X}: {blk[0].__name__}")
+
+        func, cycles = blk
+        func(self)
+        if cycles < self.ctr:
+            # No frame boundary inside the block
+            self.ctr -= cycles
+        else:
+            for _ in range(cycles):
+                self.timer()
+
+
+EMU_TYPES = {
+    "basic": EmuInterpreter,
+    "b": EmuInterpreter,
+    "predecoded": EmuPreDecoded,
+    "pd": EmuPreDecoded,
+    "basicblock": EmuBasicBlock,
+    "bb": EmuBasicBlock,
+    "threaded": EmuThreaded,
+    "th": EmuThreaded,
+    "aot": EmuAOT,
+}
@@ -0,0 +1,133 @@
+from chip8.emulator import EMU_TYPES
+import random
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class MissingDependencyError(ImportError):
+    def __init__(self, option: str, package: str):
+        self.option = option
+        self.package = package
+        super().__init__(f"{option} requires {package}, which is not installed")
+
+
+class AddressReward:
+    """Reward the change of a big-endian value in memory, e.g. a score counter."""
+
+    def __init__(self, addr: int, size: int = 1, scale: float = 1.0):
+        self.addr = addr
+        self.size = size
+        self.scale = scale
+        self.last = 0
+
+    def value(self, emu) -> int:
+        return int.from_bytes(emu.mem[self.addr : self.addr + self.size], "big")
+
+    def reset(self, emu):
+        self.last = self.value(emu)
+
+    def __call__(self, emu) -> float:
+        value = self.value(emu)
+        delta = value - self.last
+        self.last = value
+        return delta * self.scale
+
+
+class AddressDone:
+    """Episode ends once a byte in memory (or a register, with reg=True) equals value."""
+
+    def __init__(self, addr: int, value: int, reg: bool = False):
+        self.addr = addr
+        self.value = value
+        self.reg = reg
+
+    def reset(self, emu):
+        pass
+
+    def __call__(self, emu) -> bool:
+        buf = emu.v if self.reg else emu.mem
+        return buf[self.addr] == self.value
+
+
+class Chip8Env:
+    """
+    Gym-style environment. step() presses the keys of the chosen action and
+    runs whole 60 Hz frames. Observations are views of the emulator's own
+    buffers and are never copied, so they change with the emulator; copy
+    them if they need to be kept. Every reset() reseeds the emulator's
+    random number generator from the environment's own, which a seed
+    passed to the constructor or to reset() makes reproducible.
+    """
+
+    def __init__(
+        self,
+        rom: str,
+        emu_type: str = "basicblock",
+        frames: int = 4,
+        actions: list = None,
+        rewards: list = (),
+        dones: list = (),
+        max_frames: int = None,
+        unpack: bool = False,
+        seed: int = None,
+        **kwargs,
+    ):
+        if unpack and np is None:
+            raise MissingDependencyError("unpack=True", "numpy")
+
+        self.rng = random.Random(seed)
+        self.emu = EMU_TYPES[emu_type](rom, seed=seed, **kwargs)
+        self.frames = frames
+        # Key masks, bit k pressed means key k is down
+        self.actions = actions if actions is not None else [0] + [1 << k for k in range(16)]
+        self.rewards = list(rewards)
+        self.dones = list(dones)
+        self.max_frames = max_frames
+        self.unpack = unpack
+
+        self.initial = self.emu.snapshot()
+        self.screen = memoryview(self.emu.scr)
+        self.registers = memoryview(self.emu.v)
+        if np is not None:
+            self.screen = np.frombuffer(self.emu.scr, dtype=np.uint8)
+            self.registers = np.frombuffer(self.emu.v, dtype=np.uint8)
+
+    @property
+    def observation_shape(self) -> tuple:
+        scr = self.emu.scr
+        return (scr.height, scr.width) if self.unpack else (scr.size,)
+
+    def observation(self):
+        if self.unpack:
+            scr = self.emu.scr
+            return np.unpackbits(self.screen).reshape(scr.height, scr.width)
+        return self.screen
+
+    def reset(self, seed: int = None):
+        self.emu.restore(self.initial)
+        if seed is not None:
+            self.rng.seed(seed)
+        # Without this every episode would replay the random numbers of the first
+        self.emu.rng.seed(self.rng.getrandbits(64))
+        for hook in self.rewards + self.dones:
+            hook.reset(self.emu)
+        return self.observation(), {}
+
+    def step(self, action: int, frames: int = None):
+        emu = self.emu
+        mask = self.actions[action]
+        emu.kbd[0] = mask & 0xFF
+        emu.kbd[1] = mask >> 8
+
+        emu.run_frames(self.frames if frames is None else frames)
+
+        reward = 0.0
+        for hook in self.rewards:
+            reward += hook(emu)
+        terminated = any(hook(emu) for hook in self.dones)
+        truncated = self.max_frames is not None and emu.frames >= self.max_frames
+
+        return self.observation(), reward, terminated, truncated, {"frames": emu.frames}
@@ -0,0 +1,99 @@
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class FilterSpecError(ValueError):
+    def __init__(self, spec):
+        super().__init__(f"Display filter {spec} not supported, use or[:N] or phosphor[:DECAY]")
+
+
+class OrFilter:
+    """
+    Shows a pixel if it was lit in any of the last n frames, which hides
+    the erase-then-redraw flicker of XOR sprites. Frames are kept as ints
+    so combining them is a few big-int ORs per presented frame.
+    """
+
+    def __init__(self, n: int = 3):
+        if n < 1:
+            raise FilterSpecError(f"or:{n}")
+        self.frames = deque(maxlen=n)
+
+    def reset(self):
+        self.frames.clear()
+
+    def __call__(self, scr) -> list:
+        """Layers of (packed frame, shade) to draw for the current screen."""
+        self.frames.append(int.from_bytes(scr, "big"))
+        acc = 0
+        for frame in self.frames:
+            acc |= frame
+        return [(acc.to_bytes(scr.size, "big"), 255)]
+
+
+class PhosphorFilter:
+    """
+    Lit pixels fade out instead of switching off: a pixel last lit age
+    frames ago is drawn in shade decay**age, for up to depth frames. With
+    NumPy the age of every pixel is kept in an array; otherwise the last
+    depth frames are kept as ints. Both give the same layers.
+    """
+
+    def __init__(self, decay: float = 0.6, depth: int = 4):
+        self.decay = decay
+        self.depth = depth
+        self.frames = deque(maxlen=depth)
+        self.age = None
+
+    def reset(self):
+        self.frames.clear()
+        self.age = None
+
+    def __call__(self, scr) -> list:
+        if np is not None:
+            return self._vectorized(scr)
+
+        self.frames.appendleft(int.from_bytes(scr, "big"))
+        layers = []
+        seen = 0
+        for age, frame in enumerate(self.frames):
+            fresh = frame & ~seen
+            if fresh:
+                layers.append((fresh.to_bytes(scr.size, "big"), round(255 * self.decay**age)))
+            seen |= frame
+        return layers
+
+    def _vectorized(self, scr) -> list:
+        lit = np.unpackbits(np.frombuffer(scr, dtype=np.uint8)).astype(bool)
+        if self.age is None:
+            # depth means off
+            self.age = np.full(lit.size, self.depth, dtype=np.uint16)
+        np.minimum(self.age + 1, self.depth, out=self.age)
+        self.age[lit] = 0
+
+        layers = []
+        for age in range(self.depth):
+            mask = self.age == age
+            if mask.any():
+                layers.append((np.packbits(mask).tobytes(), round(255 * self.decay**age)))
+        return layers
+
+
+FILTERS = {"or": OrFilter, "phosphor": PhosphorFilter}
+
+
+def parse(spec: str):
+    """Build a filter from "or", "or:4", "phosphor" or "phosphor:0.5"."""
+    name, _, arg = spec.lower().partition(":")
+    if name not in FILTERS:
+        raise FilterSpecError(spec)
+    if not arg:
+        return FILTERS[name]()
+    try:
+        return OrFilter(int(arg)) if name == "or" else PhosphorFilter(float(arg))
+    except ValueError:
+        raise FilterSpecError(spec) from None
@@ -1,4 +1,6 @@
+from functools import lru_cache
 import pygame
+import time
 
 KEY_MAP = {
     pygame.K_1: 0x1,
@@ -53,43 +55,97 @@ def draw_screen(surface, emu, scale):
                         (x * scale, y * scale, scale, scale),
                     )
 
-def make_square_wave(freq=44100, duration=0.1, volume=0.2, sample_rate=44100):
-    """Create a short square-wave buffer and return a pygame Sound."""
-    from array import array
-    n = int(duration * sample_rate)
-    period = sample_rate / float(freq)
-    amp = int(32767 * max(0.0, min(1.0, volume)))
-    buf = array('h')
-    for i in range(n):
-        s = amp if (i % period) < (period / 2) else -amp
-        buf.append(int(s))
-    return pygame.mixer.Sound(buffer=buf.tobytes())
+@lru_cache(maxsize=None)
+def shade_pixels(shade: int) -> tuple:
+    """RGB pixels of the 8 bits of every byte value, lit ones in shade."""
+    lit, off = bytes((shade,) * 3), bytes(3)
+    return tuple(b"".join(lit if byte & (0x80 >> px) else off for px in range(8)) for byte in range(256))
+
+def draw_layers(surface, layers, scr, scale):
+    """Render filtered (packed frame, shade) layers, see chip8.filters, as one scaled blit."""
+    # Layers never overlap, so their pixels can be combined with one big-int OR each
+    acc = 0
+    for frame, shade in layers:
+        table = shade_pixels(shade)
+        acc |= int.from_bytes(b"".join([table[byte] for byte in frame]), "big")
+    pixels = acc.to_bytes(scr.width * scr.height * 3, "big")
+    image = pygame.image.frombuffer(pixels, (scr.width, scr.height), "RGB")
+    surface.blit(pygame.transform.scale(image, (scr.width * scale, scr.height * scale)), (0, 0))
 
 def main(args):
+    # Mixer settings only apply if they are set before pygame.init
+    pygame.mixer.pre_init(frequency=44100, size=-16, channels=1, buffer=512)
     pygame.init()
     pygame.display.set_caption("CHIP-8")
-    pygame.mixer.pre_init(frequency=44100, size=8, channels=1, buffer=2048)
     clock = pygame.time.Clock()
 
-    if args.emu_type.lower() in ["basic", "b"]:
-        from chip8.emulator import EmuInterpreter as Emu
-    elif args.emu_type.lower() in ["predecoded", "pd"]:
-        from chip8.emulator import EmuPreDecoded as Emu
-    elif args.emu_type.lower() in ["basicblock", "bb"]:
-        from chip8.emulator import EmuBasicBlock as Emu
-    else:
-        from chip8.emulator import EmuPreDecoded as Emu
+    from chip8.emulator import EMU_TYPES, EmuPreDecoded, EmuBasicBlock
+
+    Emu = EMU_TYPES.get(args.emu_type.lower(), EmuPreDecoded)
+
+    kwargs = {}
+    if issubclass(Emu, EmuBasicBlock):
+        kwargs = {
+            "optimize": args.optimize,
+            "superblocks": args.superblocks,
+            "profile": args.profile,
+            "cache_size": args.bb_cache_size,
+        }
+    emu = Emu(args.rom, debug=args.debug, **kwargs)
+
+    debugger = None
+    if args.breakpoints or args.watchpoints:
+        from chip8.debugger import Debugger
+        debugger = Debugger(emu)
+        for addr in args.breakpoints:
+            debugger.add_breakpoint(addr)
+        for addr in args.watchpoints:
+            debugger.add_watchpoint(addr)
+
+    recorder = None
+    if args.record:
+        from chip8.recorder import Recorder
+        recorder = Recorder(args.record, width=emu.scr.width, height=emu.scr.height, scale=args.record_scale)
+
+    metrics = None
+    if args.metrics_port:
+        from chip8.metrics import Metrics, serve
+        metrics = Metrics()
+        metrics.register(args.rom, emu)
+        serve(metrics, args.metrics_port)
+
+    watcher = None
+    if args.reload:
+        from chip8.reload import RomWatcher
+        watcher = RomWatcher(emu, reset=args.reload_reset)
+
+    display_filter = None
+    if args.filter:
+        from chip8.filters import parse
+        display_filter = parse(args.filter)
+
+    def present():
+        if display_filter:
+            draw_layers(screen, display_filter(emu.scr), emu.scr, args.scale)
+        else:
+            draw_screen(screen, emu, args.scale)
+        pygame.display.flip()
+        if recorder:
+            recorder.capture(emu.scr)
 
-    emu = Emu(args.rom, debug=args.debug)
+    shown = emu.frames
 
-    beep_sound = make_square_wave(freq=880, duration=0.1, volume=0.2)
-    beeping = False
+    from chip8.audio import Audio
+    audio = Audio(emu.TIMER_FREQ)
 
     # Create window
     w = emu.scr.width * args.scale
     h = emu.scr.height * args.scale
     screen = pygame.display.set_mode((w, h))
 
+    ahead = args.run_ahead
+    budget = 1 / emu.TIMER_FREQ
+
     running = True
     while running:
         # Input events
@@ -107,25 +163,60 @@ def main(args):
                 if event.key in KEY_MAP:
                     set_key_bit(emu.kbd, KEY_MAP[event.key], False)
 
+        if watcher:
+            watcher.poll()
+
         # Execute one interpreter tick (fetch-decode-execute + timer cadence)
-        emu.tick()
-
-        st = emu.st
-        if st > 0 and not beeping:
-            beep_sound.play(loops=-1)  # loop indefinitely
-            beeping = True
-        elif st == 0 and beeping:
-            beep_sound.stop()
-            beeping = False
-
-        # Redraw only if something changed the display
-        if emu.dirty:
-            draw_screen(screen, emu, args.scale)
-            pygame.display.flip()
+        if debugger:
+            if reason := debugger.tick():
+                running = debugger.repl(reason)
+        elif args.run_ahead:
+            # Run one real frame, present the frame `ahead` frames later, then roll back
+            start = time.perf_counter()
+            emu.run_frames(1)
+            state = emu.snapshot()
+            emu.run_frames(ahead)
+            present()
+            emu.restore(state)
             emu.dirty = 0
 
-        # Pace to desired instruction frequency
-        clock.tick(args.fps)
+            # Shrink the window when it no longer fits in the frame budget
+            elapsed = time.perf_counter() - start
+            if elapsed > budget and ahead > 1:
+                ahead -= 1
+            elif elapsed < budget / 2 and ahead < args.run_ahead:
+                ahead += 1
+        elif metrics:
+            start = time.perf_counter()
+            emu.tick()
+            emu.exec_time += time.perf_counter() - start
+        else:
+            emu.tick()
+
+        audio.update(emu)
+
+        # Redraw only if something changed the display, filters fade once per frame
+        if display_filter and not args.run_ahead:
+            if emu.frames != shown:
+                shown = emu.frames
+                present()
+                emu.dirty = 0
+        elif emu.dirty:
+            present()
+            emu.dirty = 0
 
+        # Pace to desired instruction frequency, or to the timer in run-ahead mode
+        clock.tick(emu.TIMER_FREQ if args.run_ahead else args.fps)
+
+    audio.stop()
+    if recorder:
+        recorder.close()
+    if isinstance(emu, EmuBasicBlock):
+        if emu.optimizer:
+            print(emu.optimizer.report())
+        if args.bb_cache_size:
+            print(emu.bb.report())
+        if args.profile:
+            emu.save_profile(args.profile)
     pygame.quit()
 
@@ -1,5 +1,5 @@
-from functools import reduce
-from random import randint
+from functools import lru_cache, reduce
+import re
 
 
 class OpcodeNotImplementedError(ValueError):
@@ -15,6 +15,7 @@ class OpcodeTypeError(TypeError):
 class Instr:
     id = None
     name = "BASE"
+    cycles = 1
 
     def __init__(self, opcode: int, **kwargs):
         self.opcode = opcode
@@ -44,9 +45,11 @@ class Chain(Instr):
     name = "CHN"
     seperator = "  "
 
-    def __init__(self, *instrs: Instr, **kwargs):
+    def __init__(self, *instrs: Instr, cycles: int = None, **kwargs):
         super().__init__(None, **kwargs)
         self.instrs = instrs
+        # Number of original instructions, which may differ from len(instrs) once optimized
+        self.cycles = sum(i.cycles for i in instrs) if cycles is None else cycles
 
     def eval(self, emu):
         if self.instrs:
@@ -64,6 +67,70 @@ class Chain(Instr):
         return "\n".join(lines)
 
 
+def _record(emu, skip: int, addr: int):
+    """Count which way the skip at skip went, and re-form the block at addr every HOT runs."""
+    counts = emu.profile.setdefault(skip, [0, 0])
+    counts[emu.pc != skip + 2] += 1
+    total = counts[0] + counts[1]
+    # Checked again every HOT runs, so skips that only turn biased later still get promoted
+    if total >= emu.HOT and not total % emu.HOT and emu.hot_side(skip) is not None:
+        emu.promote(addr)
+
+
+class Probe(Chain):
+    """Basic block ending in a conditional skip that records which way the skip went."""
+
+    def __init__(self, *instrs: Instr, addr: int, **kwargs):
+        super().__init__(*instrs, **kwargs)
+        self.addr = addr
+        self.skip = addr + 2 * (self.cycles - 1)
+
+    def eval(self, emu):
+        super().eval(emu)
+        _record(emu, self.skip, self.addr)
+
+
+class Superblock(Chain):
+    """
+    Basic blocks strung together along the hot side of their conditional
+    skips. Each skip becomes a guard: when it goes the other way the
+    superblock is left early. Sets the PC and runs the timers itself. A
+    skip ending the last segment, tail, is profiled like in a Probe so the
+    superblock can grow once it turns biased.
+    """
+
+    name = "SBK"
+
+    def __init__(self, *segments: tuple, tail: int = None, **kwargs):
+        super().__init__(*[chain for _, chain, _ in segments], cycles=0, **kwargs)
+        self.segments = segments
+        self.tail = tail
+
+    def eval(self, emu):
+        counts = emu.exits.setdefault(self.segments[0][0], [0, 0])
+        counts[0] += 1
+        for addr, chain, hot in self.segments:
+            emu.pc = (addr + 2 * chain.cycles) & 0x0FFF
+            chain.eval(emu)
+            for _ in range(chain.cycles):
+                emu.timer()
+            if hot is not None and emu.pc != hot:
+                counts[1] += 1
+                if counts[1] >= emu.HOT and counts[1] > (1 - emu.BIAS) * counts[0]:
+                    emu.deoptimize(self)
+                return
+        if self.tail is not None:
+            _record(emu, self.tail, self.segments[0][0])
+
+
+class BreakpointHit(Exception):
+    def __init__(self, addr: int, error: Exception = None):
+        self.addr = addr
+        self.error = error
+        reason = f", condition failed: {type(error).__name__}: {error}" if error is not None else ""
+        super().__init__(f"Breakpoint at 0x{addr:03X}{reason}")
+
+
 class Dud(Instr):
     id = None
     name = "DUD"
@@ -110,6 +177,54 @@ class Graphics(Instr):
     name = "GRAPHICS"
 
 
+class Breakpoint(Branch):
+    name = "BRK"
+
+    def __init__(self, instr: Instr, cond=None, **kwargs):
+        super().__init__(instr.opcode, **kwargs)
+        self.instr = instr
+        self.cond = cond
+        self.armed = True
+
+    def eval(self, emu):
+        if self.armed:
+            try:
+                hit = self.cond is None or self.cond(emu)
+            except Exception as e:
+                # A condition that cannot be evaluated stops like a hit
+                emu.unnext()
+                raise BreakpointHit(emu.pc, error=e) from e
+            if hit:
+                emu.unnext()
+                raise BreakpointHit(emu.pc)
+        self.armed = True
+        self.instr.eval(emu)
+
+    def __str__(self):
+        return f"{self.name+':':4} {self.instr}"
+
+
+class Undecoded(Branch):
+    """
+    Code cache entry for memory outside the decoded image. The first time
+    it runs it decodes its word into the emulator's own code cache, see
+    EmuPreDecoded.decoded, so stores to memory that never runs as code
+    never have to touch the caches. Zero words do nothing, like the Dud
+    entries before.
+    """
+
+    name = "UND"
+
+    def __init__(self, **kwargs):
+        super().__init__(None, **kwargs)
+
+    def eval(self, emu):
+        # Always the last instruction of its block, so it sits right before the PC
+        instr = emu.decoded((emu.pc - 2) & 0x0FFF)
+        if type(instr) is not Undecoded:
+            instr.eval(emu)
+
+
 class Ix00E0(Graphics):
     id = "00E0"
     name = "CLS"
@@ -408,7 +523,7 @@ class IxCXNN(Load):
         self.nn = nn
 
     def eval(self, emu):
-        emu.v[self.x] = self.nn & randint(0, 255)
+        emu.v[self.x] = self.nn & emu.rng.randint(0, 255)
 
 
 class IxDXYN(Graphics):
@@ -511,6 +626,28 @@ class IxFX18(Load):
         emu.st = emu.v[self.x]
 
 
+class IxF002(Load):
+    id = "F002"
+    name = "AUD"
+
+    def eval(self, emu):
+        # XO-CHIP: 16 byte (128 bit) audio pattern at I
+        emu.pattern = bytes(emu.mem[emu.i : emu.i + 16])
+
+
+class IxFX3A(Load):
+    id = "FX3A"
+    name = "PIT"
+
+    def __init__(self, opcode: int, x: int, **kwargs):
+        super().__init__(opcode, **kwargs)
+        self.x = x
+
+    def eval(self, emu):
+        # XO-CHIP: pattern playback rate is 4000 * 2 ** ((pitch - 64) / 48) bits per second
+        emu.pitch = emu.v[self.x]
+
+
 class IxFX1E(Math):
     id = "FX1E"
     name = "ADD"
@@ -547,6 +684,7 @@ class IxFX33(Load):
         emu.mem[emu.i + 0] = emu.v[self.x] // 100
         emu.mem[emu.i + 1] = emu.v[self.x] // 10 % 10
         emu.mem[emu.i + 2] = emu.v[self.x] % 10
+        emu.store(emu.i, emu.i + 3)
 
 
 class IxFX55(Load):
@@ -560,14 +698,7 @@ class IxFX55(Load):
     def eval(self, emu):
         for i in range(self.x + 1):
             emu.mem[emu.i + i] = emu.v[i]
-        
-        from chip8.emulator import EmuPreDecoded, EmuBasicBlock
-        if isinstance(emu, (EmuPreDecoded, EmuBasicBlock)):
-            emu._build_cache(beg=emu.i & 0xFFFE, end=emu.i + self.x + 1)
-        if isinstance(emu, EmuBasicBlock):
-            for k in list(emu.bb.keys()):
-                if  k <= emu.i and emu.i + self.x + 1 <= k + 2*len(emu.bb[k].instrs):
-                    del self.bb[k]
+        emu.store(emu.i, emu.i + self.x + 1)
 
         if emu.quirk_memory:
             emu.i += self.x + 1
@@ -589,8 +720,6 @@ class IxFX65(Load):
 
 
 def match(opcode: int | str) -> Instr:
-    import re
-
     if isinstance(opcode, int):
         opcode_str = f"{opcode:04X}"
     elif isinstance(opcode, str):
@@ -598,13 +727,20 @@ def match(opcode: int | str) -> Instr:
     else:
         raise OpcodeTypeError(opcode)
 
-    for cls in [ssc for sc in Instr.__subclasses__() for ssc in sc.__subclasses__()]:
-        pattern = getattr(cls, "id", None)
-        if not pattern:
-            continue
+    return _match(opcode_str)
+
 
-        regex = "^" + re.sub(r"[NXY]", ".", pattern) + "$"
-        if re.match(regex, opcode_str):
+@lru_cache(maxsize=None)
+def _match(opcode_str: str) -> Instr:
+    for regex, cls in PATTERNS:
+        if regex.match(opcode_str):
             return cls
 
     return Debug
+
+
+PATTERNS = tuple(
+    (re.compile("^" + re.sub(r"[NXY]", ".", cls.id) + "$"), cls)
+    for cls in [ssc for sc in Instr.__subclasses__() for ssc in sc.__subclasses__()]
+    if getattr(cls, "id", None)
+)
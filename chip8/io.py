@@ -1,3 +1,6 @@
+from time import perf_counter
+
+
 class ByteArrayExtended(bytearray):
     def __init__(self, width: int, height: int):
         self.width = width
@@ -9,6 +12,12 @@ class ByteArrayExtended(bytearray):
         for i in range(self.size):
             self[i] = 0
 
+    def copy(self):
+        other = type(self).__new__(type(self))
+        bytearray.__init__(other, self)
+        other.__dict__.update(self.__dict__)
+        return other
+
     def __str__(self):
         acc = ""
         acc += "*" * (self.width + 2)
@@ -35,6 +44,10 @@ class Screen(ByteArrayExtended):
 
     def __init__(self, width: int = SCREEN_WIDTH, height: int = SCREEN_HEIGHT):
         super().__init__(width=width, height=height)
+        self.draws = 0
+        # Time spent drawing is only measured when asked for, e.g. by chip8.metrics
+        self.timing = False
+        self.draw_time = 0.0
 
     def draw(self, emu, x: int, y: int, n: int):
         if emu.quirk_disp_wait:
@@ -44,6 +57,10 @@ class Screen(ByteArrayExtended):
             else:
                 emu.it = 1
 
+        timing = self.timing
+        if timing:
+            start = perf_counter()
+
         xx = emu.v[x] % self.width
         yy = emu.v[y] % self.height
         emu.v[0xF] = 0
@@ -75,6 +92,10 @@ class Screen(ByteArrayExtended):
 
                 self[basel] ^= lower
 
+        self.draws += 1
+        if timing:
+            self.draw_time += perf_counter() - start
+
 
 class Keyboard(ByteArrayExtended):
     KEYBOARD_WIDTH = 4
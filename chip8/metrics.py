@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+
+from chip8.instructions import _match
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import urlopen
+import argparse
+import threading
+import time
+
+
+# Every series, as (type, help text). Rates are left to the client, from two scrapes of the counters.
+FAMILIES = {
+    "instructions_total": ("counter", "Instructions executed"),
+    "frames_total": ("counter", "60 Hz frames emulated"),
+    "execute_seconds_total": ("counter", "Seconds spent executing instructions"),
+    "draw_seconds_total": ("counter", "Seconds spent drawing sprites"),
+    "draws_total": ("counter", "Sprites drawn"),
+    "invalidations_total": ("counter", "Code cache invalidations by self-modifying code"),
+    "lag_frames": ("gauge", "Frames the session is behind a 60 Hz wall clock since it was registered"),
+    "block_cache_hits_total": ("counter", "Basic block cache hits"),
+    "block_cache_misses_total": ("counter", "Basic block cache misses"),
+    "block_cache_hit_ratio": ("gauge", "Basic block cache hit ratio"),
+    "block_cache_evictions_total": ("counter", "Basic blocks evicted by the cache capacity"),
+    "block_cache_invalidations_total": ("counter", "Basic blocks dropped by self-modifying code"),
+    "block_cache_blocks": ("gauge", "Basic blocks cached"),
+    "match_cache_hits_total": ("counter", "Process-wide opcode match memo hits, all sessions"),
+    "match_cache_misses_total": ("counter", "Process-wide opcode match memo misses, all sessions"),
+    "match_cache_hit_ratio": ("gauge", "Process-wide opcode match memo hit ratio, all sessions"),
+}
+
+
+class Metrics:
+    """
+    Performance counters of running emulators in the Prometheus text format.
+    Nothing is counted per instruction: instructions are derived from the
+    timer counters and everything else is counted per frame, draw or cache
+    event, so the counters can stay on. Execution and draws are only
+    timed once a session is registered. Scrapes
+    only read, so any number of clients can poll at once and compute
+    rates from the counters themselves.
+    """
+
+    def __init__(self):
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def register(self, name: str, emu):
+        emu.timing = True
+        emu.scr.timing = True
+        with self.lock:
+            self.sessions[name] = {
+                "emu": emu,
+                "start": time.perf_counter(),
+                "frames": emu.frames,
+            }
+
+    def unregister(self, name: str):
+        with self.lock:
+            self.sessions.pop(name, None)
+
+    def sample(self, name: str) -> dict:
+        session = self.sessions[name]
+        emu = session["emu"]
+        now = time.perf_counter()
+        frames = emu.frames
+
+        # Frames the session is behind a 60 Hz wall clock since it was registered
+        expected = (now - session["start"]) * emu.TIMER_FREQ
+        lag = max(0.0, expected - (frames - session["frames"]))
+
+        values = {
+            "instructions_total": emu.instructions(),
+            "frames_total": frames,
+            "execute_seconds_total": emu.exec_time,
+            "draw_seconds_total": emu.scr.draw_time,
+            "draws_total": emu.scr.draws,
+            "invalidations_total": emu.invalidations,
+            "lag_frames": lag,
+        }
+        bb = getattr(emu, "bb", None)
+        if bb is not None:
+            lookups = bb.hits + bb.misses
+            values.update(
+                block_cache_hits_total=bb.hits,
+                block_cache_misses_total=bb.misses,
+                block_cache_hit_ratio=bb.hits / lookups if lookups else 0.0,
+                block_cache_evictions_total=bb.evictions,
+                block_cache_invalidations_total=bb.invalidations,
+                block_cache_blocks=len(bb),
+            )
+        return values
+
+    def render(self) -> str:
+        # Samples grouped by family, one per session
+        samples = {metric: [] for metric in FAMILIES}
+        with self.lock:
+            for name in self.sessions:
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                for metric, value in self.sample(name).items():
+                    samples[metric].append((f'{{session="{label}"}}', value))
+
+        # Opcode to instruction class memo, shared by every emulator in the process
+        info = _match.cache_info()
+        lookups = info.hits + info.misses
+        samples["match_cache_hits_total"].append(("", info.hits))
+        samples["match_cache_misses_total"].append(("", info.misses))
+        samples["match_cache_hit_ratio"].append(("", info.hits / lookups if lookups else 0.0))
+
+        lines = []
+        for metric, (kind, text) in FAMILIES.items():
+            if not samples[metric]:
+                continue
+            lines.append(f"# HELP chip8_{metric} {text}")
+            lines.append(f"# TYPE chip8_{metric} {kind}")
+            lines += [f"chip8_{metric}{labels} {value}" for labels, value in samples[metric]]
+        return "\n".join(lines) + "\n"
+
+
+def serve(metrics: Metrics, port: int = 9060, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve metrics.render() at /metrics from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def scrape(url: str) -> dict:
+    """Fetch a metrics page as {(metric, session): value}."""
+    values = {}
+    for line in urlopen(url).read().decode().splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name, value = line.rsplit(" ", 1)
+        metric, _, labels = name.partition("{")
+        values[(metric, labels.rstrip("}").partition("=")[2].strip('"'))] = float(value)
+    return values
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Poll the metrics endpoint of a running emulator")
+    parser.add_argument("url", nargs="?", default="http://127.0.0.1:9060/metrics")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between scrapes")
+    parser.add_argument("--count", type=int, default=None, help="Stop after this many scrapes")
+    args = parser.parse_args()
+
+    n = 0
+    last, then = {}, None
+    while args.count is None or n < args.count:
+        values = scrape(args.url)
+        now = time.monotonic()
+        for session in sorted({s for _, s in values if s}):
+            get = lambda metric: values.get((f"chip8_{metric}", session), 0.0)
+
+            # Rates from the counters of this client's previous scrape
+            def rate(metric):
+                key = (f"chip8_{metric}", session)
+                if then is None or key not in last:
+                    return 0.0
+                return (values.get(key, 0.0) - last[key]) / (now - then)
+
+            busy = get("execute_seconds_total")
+            print(
+                f"{session}: {rate('instructions_total'):10,.0f} instr/s {rate('frames_total'):5.1f} fps "
+                f"draw {get('draw_seconds_total') / busy if busy else 0.0:5.1%} of execute "
+                f"bb hits {get('block_cache_hit_ratio'):6.1%} "
+                f"invalidations {get('invalidations_total'):.0f} lag {get('lag_frames'):.1f} frames"
+            )
+        print(f"match cache hits (process-wide) {values.get(('chip8_match_cache_hit_ratio', ''), 0.0):.1%}")
+        last, then = values, now
+        n += 1
+        if args.count is None or n < args.count:
+            time.sleep(args.interval)
@@ -0,0 +1,175 @@
+from chip8.instructions import (
+    Instr, Chain, Load, Math, Graphics,
+    Ix6XNN, Ix7XNN, Ix8XY0, Ix8XY1, Ix8XY2, Ix8XY3, Ix8XY4, Ix8XY5, Ix8XY6, Ix8XY7, Ix8XYE,
+    Ix3XNN, Ix4XNN, Ix5XY0, Ix9XY0, IxANNN, IxCXNN, IxDXYN, IxEX9E, IxEXA1,
+    IxFX07, IxFX15, IxFX18, IxFX1E, IxFX29, IxFX33, IxFX55, IxFX65, IxF002, IxFX3A,
+)
+
+I = 16
+ALL = frozenset(range(17))
+NONE = frozenset()
+
+
+class SetRegs(Load):
+    name = "LD*"
+
+    def __init__(self, pairs: tuple, cycles: int, **kwargs):
+        super().__init__(None, **kwargs)
+        self.pairs = pairs
+        self.cycles = cycles
+
+    def eval(self, emu):
+        v = emu.v
+        for x, nn in self.pairs:
+            v[x] = nn
+
+    def __str__(self):
+        return f"{self.name+':':4} " + " ".join(f"V{x:X}={nn}" for x, nn in self.pairs)
+
+
+class AddReg(Math):
+    name = "ADD*"
+
+    def __init__(self, x: int, nn: int, cycles: int, **kwargs):
+        super().__init__(None, **kwargs)
+        self.x = x
+        self.nn = nn
+        self.cycles = cycles
+
+    def eval(self, emu):
+        emu.v[self.x] = (emu.v[self.x] + self.nn) & 0xFF
+
+
+class DrawAt(Graphics):
+    name = "DRW*"
+
+    def __init__(self, nnn: int, x: int, y: int, n: int, cycles: int, **kwargs):
+        super().__init__(None, **kwargs)
+        self.nnn = nnn
+        self.x = x
+        self.y = y
+        self.n = n
+        self.cycles = cycles
+
+    def eval(self, emu):
+        emu.i = self.nnn
+        emu.scr.draw(emu, self.x, self.y, self.n)
+        emu.dirty = 1
+
+
+class Optimizer:
+    """
+    Peephole pass over basic blocks. Register writes that are overwritten
+    before being read are removed, and common sequences are fused into
+    superinstructions. Every result keeps the cycle count of the
+    instructions it replaces, so PC advance and timers are unchanged.
+    Statistics are kept per block start, so blocks formed again after an
+    invalidation or a promotion are not counted twice.
+    """
+
+    def __init__(self, emu):
+        self.emu = emu
+        # Counts of the latest block formed at each start address
+        self.blocks = {}
+        self.counts = None
+
+    @property
+    def stats(self) -> dict:
+        stats = {"blocks": len(self.blocks), "instrs": 0, "eliminated": 0, "fused": 0}
+        for counts in self.blocks.values():
+            for k, n in counts.items():
+                stats[k] += n
+        return stats
+
+    def effects(self, instr: Instr):
+        """Return (reads, definite writes, removable) in terms of V0-VF and I (16)."""
+        t = type(instr)
+        emu = self.emu
+        if t is Ix6XNN or t is IxFX07:
+            return NONE, {instr.x}, True
+        if t is Ix7XNN:
+            return {instr.x}, {instr.x}, True
+        if t is Ix8XY0:
+            return {instr.y}, {instr.x}, True
+        if t in (Ix8XY1, Ix8XY2, Ix8XY3):
+            return {instr.x, instr.y}, {instr.x, 0xF} if emu.quirk_vf_reset else {instr.x}, True
+        if t in (Ix8XY4, Ix8XY5, Ix8XY6, Ix8XY7, Ix8XYE):
+            return {instr.x, instr.y}, {instr.x, 0xF}, True
+        if t is IxANNN:
+            return NONE, {I}, True
+        if t is IxFX1E:
+            return {instr.x, I}, {I}, True
+        if t is IxFX29:
+            return {instr.x}, {I}, True
+        if t is IxCXNN:
+            # Not removable, it advances the random number generator
+            return NONE, {instr.x}, False
+        if t in (Ix3XNN, Ix4XNN, IxEX9E, IxEXA1, IxFX15, IxFX18, IxFX3A):
+            return {instr.x}, NONE, False
+        if t is IxF002:
+            return {I}, NONE, False
+        if t in (Ix5XY0, Ix9XY0):
+            return {instr.x, instr.y}, NONE, False
+        if t is IxDXYN:
+            # VF is left untouched while waiting for the display
+            return {instr.x, instr.y, I}, NONE, False
+        if t is IxFX33:
+            return {instr.x, I}, NONE, False
+        if t is IxFX55:
+            return set(range(instr.x + 1)) | {I}, NONE, False
+        if t is IxFX65:
+            return {I}, set(range(instr.x + 1)), False
+        return ALL, NONE, False
+
+    def eliminate(self, instrs: tuple) -> list:
+        # Everything is live when the block is left
+        live = set(ALL)
+        kept = []
+        for instr in reversed(instrs):
+            reads, writes, removable = self.effects(instr)
+            if removable and not (writes & live):
+                self.counts["eliminated"] += 1
+                continue
+            live -= writes
+            live |= reads
+            kept.append(instr)
+        kept.reverse()
+        return kept
+
+    @staticmethod
+    def pairs(instr: Instr) -> tuple:
+        return instr.pairs if type(instr) is SetRegs else ((instr.x, instr.nn),)
+
+    def fuse(self, instrs: list) -> list:
+        out = []
+        for instr in instrs:
+            t = type(instr)
+            prev = out[-1] if out else None
+            tp = type(prev)
+            if t is Ix6XNN and (tp is Ix6XNN or tp is SetRegs):
+                out[-1] = SetRegs(self.pairs(prev) + ((instr.x, instr.nn),), prev.cycles + 1)
+            elif t is Ix7XNN and (tp is Ix6XNN or tp is SetRegs) and self.pairs(prev)[-1][0] == instr.x:
+                *head, (x, nn) = self.pairs(prev)
+                out[-1] = SetRegs((*head, (x, (nn + instr.nn) & 0xFF)), prev.cycles + 1)
+            elif t is Ix7XNN and (tp is Ix7XNN or tp is AddReg) and prev.x == instr.x:
+                out[-1] = AddReg(instr.x, (prev.nn + instr.nn) & 0xFF, prev.cycles + 1)
+            elif t is IxDXYN and tp is IxANNN:
+                out[-1] = DrawAt(prev.nnn, instr.x, instr.y, instr.n, prev.cycles + 1)
+            else:
+                out.append(instr)
+                continue
+            self.counts["fused"] += 1
+        return out
+
+    def optimize(self, chain: Chain, addr: int) -> Chain:
+        self.counts = {"instrs": chain.cycles, "eliminated": 0, "fused": 0}
+        instrs = self.fuse(self.eliminate(chain.instrs))
+        self.blocks[addr] = self.counts
+        return Chain(*instrs, cycles=chain.cycles)
+
+    def report(self) -> str:
+        s = self.stats
+        return (
+            f"{self.emu.rom}: {s['blocks']} blocks, {s['instrs']} instructions, "
+            f"{s['eliminated']} eliminated, {s['fused']} fused"
+        )
@@ -0,0 +1,263 @@
+import hashlib
+import queue
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+
+
+class RecorderFormatError(ValueError):
+    def __init__(self, fmt):
+        super().__init__(f"Recording format {fmt} not supported")
+
+
+def pixel_table(scale: int, on: int, off: int) -> list:
+    """Map every packed byte to its 8 pixels, one byte per pixel, repeated scale times."""
+    return [
+        b"".join((bytes([on]) if byte & (0x80 >> b) else bytes([off])) * scale for b in range(8))
+        for byte in range(256)
+    ]
+
+
+def expand_rows(frame: bytes, width: int, height: int, scale: int, table: list) -> list:
+    """Unpack a 1bpp frame into scaled rows with one byte per pixel."""
+    bpr = width // 8
+    rows = []
+    for y in range(height):
+        row = b"".join(table[byte] for byte in frame[y * bpr : (y + 1) * bpr])
+        rows.extend([row] * scale)
+    return rows
+
+
+class RawWriter:
+    """Frame stream where every distinct frame is stored once and repeats are back-references."""
+
+    MAGIC = b"C8RF"
+    HEADER = struct.Struct(">4sHH")
+    RECORD = struct.Struct(">IH")
+
+    def __init__(self, path: Path, width: int, height: int, **kwargs):
+        self.file = open(path, "wb")
+        self.file.write(self.HEADER.pack(self.MAGIC, width, height))
+        self.index = {}
+
+    def write(self, frame: bytes, digest: bytes, duration: float):
+        ms = min(round(duration * 1000), 0xFFFF)
+        if digest in self.index:
+            self.file.write(self.RECORD.pack(self.index[digest], ms))
+        else:
+            self.index[digest] = len(self.index)
+            self.file.write(self.RECORD.pack(self.index[digest], ms))
+            self.file.write(frame)
+
+    def close(self):
+        self.file.close()
+
+
+def read_raw(path):
+    """Yield (frame, duration) pairs from a recording written by RawWriter."""
+    with open(path, "rb") as f:
+        magic, width, height = RawWriter.HEADER.unpack(f.read(RawWriter.HEADER.size))
+        if magic != RawWriter.MAGIC:
+            raise RecorderFormatError(magic)
+        size = width * height // 8
+        frames = []
+        while record := f.read(RawWriter.RECORD.size):
+            index, ms = RawWriter.RECORD.unpack(record)
+            if index == len(frames):
+                frames.append(f.read(size))
+            yield frames[index], ms / 1000
+
+
+class PngWriter:
+    """Numbered PNG sequence plus a frames.txt manifest; repeated frames share one file."""
+
+    def __init__(self, path: Path, width: int, height: int, scale: int = 1, **kwargs):
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self.table = pixel_table(scale, 0xFF, 0x00)
+        self.manifest = open(path / "frames.txt", "w")
+        self.files = {}
+
+    def encode(self, frame: bytes) -> bytes:
+        rows = expand_rows(frame, self.width, self.height, self.scale, self.table)
+        raw = b"".join(b"\x00" + row for row in rows)
+        w = self.width * self.scale
+        h = self.height * self.scale
+
+        def chunk(kind, data):
+            return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+        return b"".join([
+            b"\x89PNG\r\n\x1a\n",
+            chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 0, 0, 0, 0)),
+            chunk(b"IDAT", zlib.compress(raw, 9)),
+            chunk(b"IEND", b""),
+        ])
+
+    def write(self, frame: bytes, digest: bytes, duration: float):
+        if digest not in self.files:
+            name = f"frame_{len(self.files):06d}.png"
+            (self.path / name).write_bytes(self.encode(frame))
+            self.files[digest] = name
+        self.manifest.write(f"{self.files[digest]} {duration:.4f}\n")
+
+    def close(self):
+        self.manifest.close()
+
+
+class GifWriter:
+    """Animated two-colour GIF with per-frame delays."""
+
+    MIN_CODE_SIZE = 2
+
+    def __init__(self, path: Path, width: int, height: int, scale: int = 1, **kwargs):
+        self.file = open(path, "wb")
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self.table = pixel_table(scale, 1, 0)
+        self.elapsed = 0.0
+        self.shown = 0
+
+        w = width * scale
+        h = height * scale
+        self.file.write(b"GIF89a")
+        self.file.write(struct.pack("<HHBBB", w, h, 0x80 | 0x01, 0, 0))
+        self.file.write(b"\x00\x00\x00\xff\xff\xff\x00\x00\x00\x00\x00\x00")
+        self.file.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00")
+
+    def lzw(self, data: bytes) -> bytes:
+        clear = 1 << self.MIN_CODE_SIZE
+        eoi = clear + 1
+        out = bytearray()
+        acc = 0
+        bits = 0
+
+        def emit(code, size):
+            nonlocal acc, bits
+            acc |= code << bits
+            bits += size
+            while bits >= 8:
+                out.append(acc & 0xFF)
+                acc >>= 8
+                bits -= 8
+
+        table = {bytes([i]): i for i in range(clear)}
+        next_code = eoi + 1
+        size = self.MIN_CODE_SIZE + 1
+        emit(clear, size)
+
+        w = b""
+        for c in data:
+            wc = w + bytes([c])
+            if wc in table:
+                w = wc
+                continue
+            emit(table[w], size)
+            if next_code == 4096:
+                emit(clear, size)
+                table = {bytes([i]): i for i in range(clear)}
+                next_code = eoi + 1
+                size = self.MIN_CODE_SIZE + 1
+            else:
+                table[wc] = next_code
+                if next_code == (1 << size) and size < 12:
+                    size += 1
+                next_code += 1
+            w = bytes([c])
+
+        if w:
+            emit(table[w], size)
+        emit(eoi, size)
+        if bits:
+            out.append(acc & 0xFF)
+        return bytes(out)
+
+    def write(self, frame: bytes, digest: bytes, duration: float):
+        # Round on the running total so long recordings don't drift
+        self.elapsed += duration
+        delay = max(int(round(self.elapsed * 100)) - self.shown, 1)
+        self.shown += delay
+
+        rows = expand_rows(frame, self.width, self.height, self.scale, self.table)
+        data = self.lzw(b"".join(rows))
+
+        self.file.write(struct.pack("<BBBBHBB", 0x21, 0xF9, 4, 0, min(delay, 0xFFFF), 0, 0))
+        self.file.write(struct.pack("<BHHHHB", 0x2C, 0, 0, self.width * self.scale, self.height * self.scale, 0))
+        self.file.write(bytes([self.MIN_CODE_SIZE]))
+        for i in range(0, len(data), 255):
+            block = data[i : i + 255]
+            self.file.write(bytes([len(block)]) + block)
+        self.file.write(b"\x00")
+
+    def close(self):
+        self.file.write(b"\x3b")
+        self.file.close()
+
+
+class Recorder:
+    WRITERS = {"raw": RawWriter, "png": PngWriter, "gif": GifWriter}
+
+    def __init__(self, path: str, fmt: str = None, width: int = 64, height: int = 32, scale: int = 1, clock=time.monotonic):
+        path = Path(path)
+        if fmt is None:
+            fmt = {".gif": "gif", ".png": "png", "": "png"}.get(path.suffix.lower(), "raw")
+        if fmt not in self.WRITERS:
+            raise RecorderFormatError(fmt)
+
+        self.writer = self.WRITERS[fmt](path, width, height, scale=scale)
+        self.clock = clock
+
+        self.frames = 0
+        self.duplicates = 0
+        self.last = None
+        self.pending = None
+        self.error = None
+
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            while (item := self.queue.get()) is not None:
+                self.writer.write(*item)
+            self.writer.close()
+        except Exception as e:
+            # Raised again on the main thread by the next capture or close
+            self.error = e
+
+    def _check(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def capture(self, scr):
+        """Record the current screen; call whenever emu.dirty is set."""
+        self._check()
+        now = self.clock()
+        digest = hashlib.blake2b(scr, digest_size=16).digest()
+        if digest == self.last:
+            self.duplicates += 1
+            return
+
+        if self.pending is not None:
+            frame, prev, start = self.pending
+            self.queue.put((frame, prev, now - start))
+        self.pending = (bytes(scr), digest, now)
+        self.last = digest
+        self.frames += 1
+
+    def close(self):
+        if self.pending is not None:
+            frame, digest, start = self.pending
+            self.queue.put((frame, digest, max(self.clock() - start, 0.01)))
+            self.pending = None
+        self.queue.put(None)
+        self.thread.join()
+        self._check()
@@ -0,0 +1,47 @@
+from pathlib import Path
+import time
+
+
+class RomWatcher:
+    """Polls the ROM file of an emulator and hot-reloads it when it changes, see Emu.reload."""
+
+    def __init__(self, emu, interval: float = 0.5, reset: bool = False):
+        self.emu = emu
+        self.interval = interval
+        self.reset = reset
+        self.next = 0.0
+        self.stamp = self._stamp()
+
+    def _stamp(self):
+        try:
+            st = Path(self.emu.rom).stat()
+        except OSError:
+            # Assemblers often replace the file, try again on the next poll
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def poll(self) -> list:
+        """Reload if the file changed since the last poll. Returns the changed ranges, if any."""
+        now = time.monotonic()
+        if now < self.next:
+            return []
+        self.next = now + self.interval
+
+        stamp = self._stamp()
+        if stamp is None or stamp == self.stamp:
+            return []
+        self.stamp = stamp
+
+        start = time.perf_counter()
+        try:
+            ranges = self.emu.reload(reset=self.reset)
+        except OSError as e:
+            # Half-written or locked by the editor, the next poll tries again
+            print(f"Reload of {self.emu.rom} failed: {e}")
+            self.stamp = None
+            return []
+        elapsed = time.perf_counter() - start
+        if self.emu.debug:
+            size = sum(end - beg for beg, end in ranges)
+            print(f"Reloaded {self.emu.rom}: {size} bytes in {len(ranges)} ranges, {elapsed * 1000:.1f} ms")
+        return ranges
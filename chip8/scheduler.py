@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+from chip8.emulator import EMU_TYPES, EmuPreDecoded
+from chip8.instructions import match, Ix1NNN, IxFX0A
+import argparse
+import time
+
+
+class Session:
+    def __init__(self, emu, name: str, priority: int = 1, budget: int = None):
+        self.emu = emu
+        self.name = name
+        self.priority = priority
+        # Most frames run in one scheduler frame, i.e. a cycle budget of budget * RATIO instructions
+        self.budget = budget or 2 * priority
+        self.due = 0
+        self.paused = False
+        self.parked = False
+
+    @property
+    def lag(self) -> int:
+        """Frames this session is behind the 60 Hz timer."""
+        return self.due
+
+    def idle(self) -> bool:
+        """Waiting in a way that frames can be skipped without any visible difference."""
+        emu = self.emu
+        if emu.dt or emu.st or emu.it:
+            return False
+        opcode = emu.ifetch(emu.pc)
+        instr = match(opcode)
+        if instr is IxFX0A:
+            return not any(emu.kbd) and not emu.release
+        # Jump to itself, how most ROMs halt
+        return instr is Ix1NNN and opcode & 0x0FFF == emu.pc
+
+
+class Scheduler:
+    """
+    Runs many emulators in one thread. Every scheduler frame each active
+    session is owed one 60 Hz frame. Sessions run in order of owed frames
+    times priority, each up to its budget, until the frame's time is used
+    up; whatever is left over is owed on the next frame, so sessions that
+    were skipped go first then. Paused sessions and sessions idling in FX0A
+    or a jump to itself are parked and cost nothing until woken.
+    """
+
+    def __init__(self, timer_freq: int = 60):
+        self.frame_time = 1 / timer_freq
+        self.sessions = {}
+        self.active = []
+        self.frames = 0
+
+    def add(self, emu, name: str, priority: int = 1, budget: int = None) -> Session:
+        session = Session(emu, name, priority=priority, budget=budget)
+        self.sessions[name] = session
+        self.active.append(session)
+        return session
+
+    def remove(self, name: str):
+        session = self.sessions.pop(name)
+        if session in self.active:
+            self.active.remove(session)
+
+    def park(self, session: Session):
+        session.parked = True
+        session.due = 0
+        self.active.remove(session)
+
+    def wake(self, name: str):
+        """Bring a parked session back, e.g. after changing its keyboard state."""
+        session = self.sessions[name]
+        if session.parked and not session.paused:
+            session.parked = False
+            self.active.append(session)
+
+    def pause(self, name: str):
+        session = self.sessions[name]
+        session.paused = True
+        if not session.parked:
+            self.park(session)
+
+    def resume(self, name: str):
+        self.sessions[name].paused = False
+        self.wake(name)
+
+    def press(self, name: str, mask: int):
+        """Set the pressed keys (bit k is key k) of a session and wake it."""
+        kbd = self.sessions[name].emu.kbd
+        kbd[0] = mask & 0xFF
+        kbd[1] = mask >> 8
+        self.wake(name)
+
+    def step(self, deadline: float = None):
+        """Run one scheduler frame. Sessions not reached before deadline (perf_counter) stay owed."""
+        self.frames += 1
+        for session in self.active:
+            session.due += 1
+
+        for session in sorted(self.active, key=lambda s: s.due * s.priority, reverse=True):
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            n = min(session.due, session.budget)
+            session.emu.run_frames(n)
+            session.due -= n
+            if session.idle():
+                self.park(session)
+
+    def run(self, frames: int = None, realtime: bool = True):
+        """Run scheduler frames, paced to the 60 Hz timer unless realtime is False."""
+        start = time.perf_counter()
+        n = 0
+        while frames is None or n < frames:
+            n += 1
+            deadline = start + n * self.frame_time
+            self.step(deadline if realtime else None)
+            if realtime:
+                time.sleep(max(0.0, deadline - time.perf_counter()))
+
+    def report(self) -> str:
+        lines = []
+        for s in self.sessions.values():
+            state = "paused" if s.paused else "parked" if s.parked else "active"
+            lines.append(f"{s.name:24} prio {s.priority} {state:6} {s.emu.frames:7} frames lag {s.lag:4}")
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run many headless sessions in one scheduler")
+    parser.add_argument("roms", nargs="+", help="Paths to CHIP-8 ROMs")
+    parser.add_argument("--emu-type", type=str, default="basicblock")
+    parser.add_argument("--sessions", type=int, default=1, help="Sessions per ROM")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    Emu = EMU_TYPES[args.emu_type]
+    kwargs = {"share": True} if issubclass(Emu, EmuPreDecoded) else {}
+    scheduler = Scheduler()
+    for rom in args.roms:
+        for k in range(args.sessions):
+            scheduler.add(Emu(rom, seed=k, **kwargs), f"{rom}#{k}")
+
+    start = time.perf_counter()
+    scheduler.run(frames=int(args.seconds / scheduler.frame_time))
+    print(scheduler.report())
+    print(f"{len(scheduler.sessions)} sessions, {len(scheduler.active)} active, {time.perf_counter() - start:.2f}s")
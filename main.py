@@ -1,15 +1,49 @@
 #!/usr/bin/env python
 
 from chip8.gui import main
-from chip8.emulator import Emu
+from chip8.emulator import Emu, EMU_TYPES, EmuPreDecoded, EmuBasicBlock
 import argparse
 
+
+def positive_int(value: str) -> int:
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {n}")
+    return n
+
+
+def port(value: str) -> int:
+    n = int(value)
+    if not 1 <= n <= 65535:
+        raise argparse.ArgumentTypeError(f"must be a port between 1 and 65535, got {n}")
+    return n
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("rom", help="Path to CHIP-8 ROM")
-    parser.add_argument("--emu-type", type=str, default="predecoded", help="One of the following: basic (b), predecoded (pd), basicblock (bb)")
+    parser.add_argument("--emu-type", type=str, default="predecoded", help="One of the following: basic (b), predecoded (pd), basicblock (bb), threaded (th), aot")
     parser.add_argument("--debug", action='store_true', help="Enable debug information")
     parser.add_argument("--scale", type=int, default=10, help="Pixel scale")
     parser.add_argument("--fps", type=int, default=Emu.INSTR_FREQ, help="Instruction ticks per second")
+    parser.add_argument("--optimize", action='store_true', help="Run the peephole optimizer over basic blocks (basicblock only)")
+    parser.add_argument("--superblocks", action='store_true', help="Form superblocks across biased conditional skips (basicblock only)")
+    parser.add_argument("--profile", type=str, default=None, help="Branch profile file loaded at start and saved on exit, implies --superblocks")
+    parser.add_argument("--bb-cache-size", type=positive_int, default=None, help="Maximum number of cached basic blocks, least recently used are evicted (basicblock only)")
+    parser.add_argument("--run-ahead", type=positive_int, default=0, help="Present the frame N frames ahead of the real state to cut input latency")
+    parser.add_argument("--break", dest="breakpoints", type=lambda a: int(a, 0), action="append", default=[], help="Stop at this address and open the debugger prompt (repeatable)")
+    parser.add_argument("--watch", dest="watchpoints", type=lambda a: int(a, 0), action="append", default=[], help="Stop on writes to this memory address (repeatable)")
+    parser.add_argument("--record", type=str, default=None, help="Record the screen to a .gif, a .raw frame stream or a directory of PNGs")
+    parser.add_argument("--record-scale", type=int, default=1, help="Pixel scale of recorded GIF/PNG frames")
+    parser.add_argument("--filter", type=str, default=None, help="Flicker filter: or[:N] (OR of the last N frames) or phosphor[:DECAY]")
+    parser.add_argument("--reload", action='store_true', help="Hot-reload the ROM when the file changes, patching only the changed bytes")
+    parser.add_argument("--reload-reset", action='store_true', help="Restart the ROM after a hot-reload instead of keeping its state")
+    parser.add_argument("--metrics-port", type=port, default=None, help="Serve performance counters on http://127.0.0.1:PORT/metrics")
     args = parser.parse_args()
+
+    if not issubclass(EMU_TYPES.get(args.emu_type.lower(), EmuPreDecoded), EmuBasicBlock):
+        if args.superblocks:
+            parser.error("--superblocks needs --emu-type basicblock")
+        if args.profile:
+            parser.error("--profile needs --emu-type basicblock")
     main(args)
\ No newline at end of file
@@ -0,0 +1,23 @@
+from chip8.debugger import Debugger, WatchpointHit
+from chip8.emulator import EmuAOT
+
+
+def rom(tmp_path, words):
+    path = tmp_path / "watch.ch8"
+    path.write_bytes(b"".join(w.to_bytes(2, "big") for w in words))
+    return str(path)
+
+
+def test_watchpoint_in_compiled_block(tmp_path):
+    # A single block from 0x200 with the BCD store at 0x212, then a halt loop
+    words = [0x6A7B, 0xA300] + [0x6000] * 7 + [0xFA33, 0x1214]
+    emu = EmuAOT(rom(tmp_path, words), cache_dir=tmp_path / "aot")
+    assert 0x200 in emu.blocks
+
+    dbg = Debugger(emu)
+    dbg.add_watchpoint(0x301)
+    hit = dbg.cont(limit=100)
+
+    assert isinstance(hit, WatchpointHit)
+    assert (hit.pc, hit.beg, hit.end) == (0x212, 0x300, 0x303)
+    assert emu.mem[0x300:0x303] == bytes([1, 2, 3])